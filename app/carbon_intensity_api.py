@@ -6,27 +6,36 @@ Carbon Intensity API client
 import requests
 import logging
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+from utils.timestamp_utils import parse_timestamp
+from utils.json_utils import loads
 
 logger = logging.getLogger(__name__)
 
+# Widest span fetched in a single request when batching several windows
+MAX_WINDOW_SPAN = timedelta(days=14)
+
 class CarbonIntensityAPI:
     """Client for the Carbon Intensity API"""
     
-    def __init__(self, base_url: str = "https://api.carbonintensity.org.uk"):
+    def __init__(self, base_url: str = "https://api.carbonintensity.org.uk", session: Optional[requests.Session] = None):
         self.base_url = base_url
-        self.session = requests.Session()
-        self.session.headers.update({
+        # A session shared with other clients keeps one connection pool for all of them
+        self.session = session or requests.Session()
+        self.headers = {
             'User-Agent': 'GridTracker/1.0'
-        })
+        }
     
-    def get_intensity_data(self, start_time: datetime, end_time: datetime) -> List[Dict]:
+    def get_intensity_data(self, start_time: datetime, end_time: datetime, raise_transient_errors: bool = False) -> List[Dict]:
         """
         Get carbon intensity data for a specific time range
         
         Args:
             start_time: Start of time range
             end_time: End of time range
+            raise_transient_errors: Raise timeouts and connection errors instead of
+                returning an empty list, so the caller can retry them
             
         Returns:
             List of data points with timestamp and emissions
@@ -46,10 +55,10 @@ class CarbonIntensityAPI:
             logger.debug(f"Fetching carbon intensity data from: {url}")
             print(f"Fetching carbon intensity data from: {url}")
             
-            response = self.session.get(url, timeout=30)
+            response = self.session.get(url, headers=self.headers, timeout=30)
             response.raise_for_status()
             
-            data = response.json()
+            data = loads(response.content)
             
             # Extract and format data points
             data_points = []
@@ -82,12 +91,61 @@ class CarbonIntensityAPI:
             return data_points
             
         except requests.exceptions.RequestException as e:
+            if raise_transient_errors and isinstance(e, (requests.Timeout, requests.ConnectionError)):
+                raise
             logger.error(f"Carbon intensity API request failed: {e}")
             return []
         except Exception as e:
             logger.error(f"Failed to process carbon intensity API response: {e}")
             return []
     
+    def get_intensity_data_windows(self, windows: List[Tuple[datetime, datetime]]) -> List[Dict]:
+        """
+        Get carbon intensity data for several time windows with as few requests as possible
+        
+        Windows are clustered into spans of at most MAX_WINDOW_SPAN. Each cluster
+        is fetched with one request, and the response is filtered back down to the
+        half-hour periods the windows asked for.
+        
+        Args:
+            windows: List of (start_time, end_time) tuples
+            
+        Returns:
+            List of data points with timestamp and emissions
+        """
+        data_points = []
+        for cluster in self.cluster_windows(windows):
+            if len(cluster) == 1:
+                data_points.extend(self.get_intensity_data(*cluster[0]))
+                continue
+            
+            # Half-hour buckets wanted, padded by one period either side to
+            # match what a request for each window on its own returns
+            wanted = set()
+            for start_time, end_time in cluster:
+                start_s = int(start_time.timestamp()) - 1800
+                end_s = int(end_time.timestamp()) + 1800
+                wanted.update(range(start_s, end_s + 1, 1800))
+            
+            points = self.get_intensity_data(cluster[0][0], max(end for _, end in cluster))
+            data_points.extend(
+                p for p in points
+                if int(parse_timestamp(p['timestamp']).timestamp()) in wanted
+            )
+        
+        return data_points
+    
+    @staticmethod
+    def cluster_windows(windows: List[Tuple[datetime, datetime]]) -> List[List[Tuple[datetime, datetime]]]:
+        """Group windows, sorted by start, into clusters spanning at most MAX_WINDOW_SPAN"""
+        clusters = []
+        for window in sorted(windows):
+            if clusters and window[1] - clusters[-1][0][0] <= MAX_WINDOW_SPAN:
+                clusters[-1].append(window)
+            else:
+                clusters.append([window])
+        return clusters
+    
     def check_health(self) -> bool:
         """
         Check if the Carbon Intensity API is accessible
@@ -105,7 +163,7 @@ class CarbonIntensityAPI:
             
             url = f"{self.base_url}/intensity/{start_str}/{end_str}"
             
-            response = self.session.get(url, timeout=10)
+            response = self.session.get(url, headers=self.headers, timeout=10)
             response.raise_for_status()
             
             # Check if response has expected structure
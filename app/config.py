@@ -18,6 +18,16 @@ class Config:
     NESO_DATA_PORTAL_COLLECTION_INTERVAL = 3600  # 1 hour
     HEALTH_CHECK_INTERVAL = 300  # 5 minutes
     MAIN_LOOP_INTERVAL = 10  # seconds
+    LATEST_TIMESTAMP_CACHE_TTL = 300  # 5 minutes
+    
+    # Carbon intensity window fetched when the table is empty or its latest timestamp is unreadable
+    CARBON_INTENSITY_FALLBACK_WINDOW = timedelta(hours=6)
+    
+    # Maximum concurrent API requests when filling gaps
+    API_CONCURRENCY = 4
+    
+    # Maximum scheduled jobs running at the same time
+    MAX_CONCURRENT_JOBS = 3
     
     # Web server settings
     WEB_SERVER_PORT = int(os.getenv('WEB_SERVER_PORT', 8000))
@@ -5,13 +5,33 @@ Generic data gap detection for grid tracker
 
 import sqlite3
 import logging
-from datetime import datetime, timezone, timedelta
+from array import array
+from collections import namedtuple
+from datetime import datetime, timezone
 from typing import List, Tuple, Optional, Dict
 from pathlib import Path
-from utils.timestamp_utils import normalize_timestamp, parse_timestamp, format_timestamp
+from utils.timestamp_utils import parse_timestamp
 
 logger = logging.getLogger(__name__)
 
+# Gaps as two parallel arrays of UTC epoch seconds; gap i covers starts[i]..ends[i].
+# detect_gap_array returns them in ascending order with adjacent slots already merged.
+GapArray = namedtuple('GapArray', 'starts ends')
+
+def to_epoch(dt: datetime) -> int:
+    """Convert a datetime to UTC epoch seconds, treating naive values as UTC"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+def from_epoch(seconds: int) -> datetime:
+    """Convert UTC epoch seconds to an aware datetime"""
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+def gap_array_to_tuples(gaps: GapArray) -> List[Tuple[datetime, datetime]]:
+    """Materialize a GapArray as a list of (gap_start, gap_end) datetimes"""
+    return [(from_epoch(start), from_epoch(end)) for start, end in zip(gaps.starts, gaps.ends)]
+
 class DataGapDetector:
     """Detect gaps in time-series data"""
     
@@ -38,6 +58,24 @@ class DataGapDetector:
             List of tuples (gap_start, gap_end) where each tuple represents a missing data point
             If gap_start == gap_end, it's a single missing point
         """
+        return gap_array_to_tuples(
+            self.detect_gap_array(table_name, granularity_minutes, start_time, end_time)
+        )
+    
+    def detect_gap_array(
+        self,
+        table_name: str,
+        granularity_minutes: int,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None
+    ) -> GapArray:
+        """
+        Detect gaps in time-series data, returned as a GapArray of epoch seconds
+        
+        Same arguments as detect_data_gaps. Use this when handling many gaps, as it
+        avoids building a pair of datetime objects per gap.
+        """
+        empty = GapArray(array('q'), array('q'))
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
@@ -50,7 +88,7 @@ class DataGapDetector:
                 
                 if not cursor.fetchone():
                     logger.error(f"Table '{table_name}' does not exist")
-                    return []
+                    return empty
                 
                 # Get data range from table if not specified
                 if start_time is None or end_time is None:
@@ -62,7 +100,7 @@ class DataGapDetector:
                     
                     if not result or not result[0] or not result[1]:
                         logger.warning(f"No data found in table '{table_name}'")
-                        return []
+                        return empty
                     
                     min_time_str, max_time_str = result
                     
@@ -75,141 +113,92 @@ class DataGapDetector:
                 # Validate time range
                 if start_time >= end_time:
                     logger.error("Start time must be before end time")
-                    return []
+                    return empty
                 
-                # Get all timestamps in the range
-                cursor.execute(f"""
-                    SELECT timestamp
+                # Stored timestamps in the range as epoch seconds truncated to the
+                # minute, matching normalize_timestamp. SQLite does the parsing.
+                slots_sql = f"""
+                    SELECT CAST(strftime('%s', timestamp) AS INTEGER) / 60 * 60 AS slot
                     FROM {table_name}
                     WHERE timestamp >= ? AND timestamp <= ?
-                    ORDER BY timestamp
-                """, (start_time.strftime('%Y-%m-%dT%H:%MZ'), end_time.strftime('%Y-%m-%dT%H:%MZ')))
+                """
+                params = (start_time.strftime('%Y-%m-%dT%H:%MZ'), end_time.strftime('%Y-%m-%dT%H:%MZ'))
                 
-                actual_timestamps = [row[0] for row in cursor.fetchall()]
+                cursor.execute(f"""
+                    SELECT MIN(slot), MAX(slot), COUNT(*) - COUNT(DISTINCT slot)
+                    FROM ({slots_sql})
+                """, params)
+                first_slot, last_slot, duplicate_count = cursor.fetchone()
                 
                 # Check for duplicates
-                duplicates = self._find_duplicate_timestamps(actual_timestamps)
-                if duplicates:
-                    logger.warning(f"Found duplicate timestamps in {table_name}: {duplicates}")
+                if duplicate_count:
+                    logger.warning(f"Found {duplicate_count} duplicate timestamps in {table_name}")
                 
-                # Generate expected timestamps
-                expected_timestamps = self._generate_expected_timestamps(
-                    start_time, end_time, granularity_minutes
-                )
+                # Pairs of neighbouring stored slots further apart than one interval
+                step = granularity_minutes * 60
+                cursor.execute(f"""
+                    SELECT prev, slot
+                    FROM (
+                        SELECT slot, LAG(slot) OVER (ORDER BY slot) AS prev
+                        FROM (SELECT DISTINCT slot FROM ({slots_sql}))
+                    )
+                    WHERE slot - prev > ?
+                """, params + (step,))
                 
                 # Find gaps
-                gaps = self._find_gaps(expected_timestamps, actual_timestamps)
+                gaps = self._build_gap_array(
+                    to_epoch(start_time), to_epoch(end_time), step,
+                    first_slot, last_slot, cursor.fetchall()
+                )
                 
-                logger.info(f"Found {len(gaps)} gaps in {table_name} between {start_time} and {end_time}")
+                logger.info(f"Found {len(gaps.starts)} gaps in {table_name} between {start_time} and {end_time}")
                 return gaps
                 
         except Exception as e:
             logger.error(f"Error detecting gaps in {table_name}: {e}")
-            return []
+            return empty
     
     def _parse_timestamp(self, timestamp_str: str) -> datetime:
         """Parse timestamp string to datetime object"""
         return parse_timestamp(timestamp_str)
     
-    def _find_duplicate_timestamps(self, timestamps: List[str]) -> List[str]:
-        """Find duplicate timestamps in the list"""
-        seen = set()
-        duplicates = []
-        for ts in timestamps:
-            if ts in seen:
-                duplicates.append(ts)
-            else:
-                seen.add(ts)
-        return duplicates
-    
-    def _generate_expected_timestamps(
-        self, 
-        start_time: datetime, 
-        end_time: datetime, 
-        granularity_minutes: int
-    ) -> List[str]:
-        """Generate list of expected timestamps based on granularity"""
-        expected = []
-        current = start_time
-        
-        while current <= end_time:
-            # Format without seconds to match database format exactly
-            expected.append(format_timestamp(current))
-            current += timedelta(minutes=granularity_minutes)
-        
-        return expected
-    
-    def _find_gaps(
-        self, 
-        expected_timestamps: List[str], 
-        actual_timestamps: List[str]
-    ) -> List[Tuple[datetime, datetime]]:
-        """Find gaps between expected and actual timestamps, consolidating consecutive gaps"""
-        gaps = []
-        
-        # Normalize actual timestamps to remove seconds for comparison
-        # This handles both formats: "2023-07-14T00:00Z" and "2023-07-14T00:00:00Z"
-        normalized_actual_set = set()
-        for actual_ts in actual_timestamps:
-            normalized_ts = normalize_timestamp(actual_ts)
-            normalized_actual_set.add(normalized_ts)
-        
-        # Find all missing timestamps
-        missing_timestamps = []
-        for expected_ts in expected_timestamps:
-            normalized_expected = normalize_timestamp(expected_ts)
-            if normalized_expected not in normalized_actual_set:
-                missing_timestamps.append(self._parse_timestamp(expected_ts))
-        
-        logger.info(f"Found {len(missing_timestamps)} missing timestamps")
-        for ts in missing_timestamps:
-            logger.info(f"  Missing: {ts}")
-        
-        # Consolidate consecutive missing timestamps into gaps
-        if not missing_timestamps:
-            return gaps
-        
-        # Sort missing timestamps
-        missing_timestamps.sort()
-        
-        # Group consecutive missing timestamps
-        current_gap_start = missing_timestamps[0]
-        current_gap_end = missing_timestamps[0]
+    def _build_gap_array(
+        self,
+        start_s: int,
+        end_s: int,
+        step: int,
+        first_slot: Optional[int],
+        last_slot: Optional[int],
+        interior: List[Tuple[int, int]]
+    ) -> GapArray:
+        """Build a GapArray from the stored range edges and the neighbouring slots that bracket each gap"""
+        starts = array('q')
+        ends = array('q')
         
-        logger.info(f"Starting gap consolidation. First missing timestamp: {current_gap_start}")
+        if first_slot is None:
+            # Nothing stored in the range, so all of it is missing
+            starts.append(start_s)
+            ends.append(start_s + (end_s - start_s) // step * step)
+            return GapArray(starts, ends)
         
-        for i in range(1, len(missing_timestamps)):
-            current_time = missing_timestamps[i]
-            expected_previous = current_gap_end + timedelta(minutes=30)
-            
-            logger.info(f"Checking {current_time} against expected previous {expected_previous}")
-            logger.info(f"  Are they consecutive? {current_time == expected_previous}")
-            
-            if current_time == expected_previous:
-                # Consecutive missing timestamp, extend the gap
-                current_gap_end = current_time
-                logger.info(f"  Extending gap to: {current_gap_start} to {current_gap_end}")
-            else:
-                # Non-consecutive, save current gap and start new one
-                logger.info(f"  Non-consecutive! Saving gap: {current_gap_start} to {current_gap_end}")
-                gaps.append((current_gap_start, current_gap_end))
-                current_gap_start = current_time
-                current_gap_end = current_time
-                logger.info(f"  Starting new gap at: {current_time}")
+        # Missing slots before the first stored one
+        if first_slot - start_s >= step:
+            starts.append(start_s)
+            ends.append(start_s + (first_slot - start_s - 1) // step * step)
         
-        # Add the last gap
-        logger.info(f"Adding final gap: {current_gap_start} to {current_gap_end}")
-        gaps.append((current_gap_start, current_gap_end))
+        # Missing slots between stored neighbours, on the grid of the earlier one
+        for prev, slot in interior:
+            starts.append(prev + step)
+            ends.append(prev + (slot - prev - 1) // step * step)
         
-        logger.info(f"Final result: {len(gaps)} consolidated gaps")
-        for gap_start, gap_end in gaps:
-            if gap_start == gap_end:
-                logger.info(f"  Single point gap: {gap_start}")
-            else:
-                time_diff = (gap_end - gap_start).total_seconds() / (30 * 60)
-                logger.info(f"  Multi-point gap: {gap_start} to {gap_end} ({time_diff:.1f} hours)")
+        # Missing slots after the last stored one
+        if end_s - last_slot >= step:
+            starts.append(last_slot + step)
+            ends.append(last_slot + (end_s - last_slot) // step * step)
         
-        return gaps
+        missing_count = sum((end - start) // step + 1 for start, end in zip(starts, ends))
+        logger.info(f"Found {missing_count} missing timestamps in {len(starts)} consolidated gaps")
+        return GapArray(starts, ends)
     
     def get_data_stats(self, table_name: str) -> Dict:
         """Get statistics about data in a table"""
@@ -1,34 +1,87 @@
 #!/usr/bin/env python3
 """
 Database operations for the Grid Tracker
+
+Generation quantities are stored as whole MW. Elexon reports them to at most
+1 MW precision, so rounding on insert loses nothing and keeps rows compact.
 """
 
 import sqlite3
 import logging
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from utils.timestamp_utils import normalize_timestamp
 from utils.timestamp_utils import iso8601_to_sqlite_datetime
 
 logger = logging.getLogger(__name__)
 
+# Generation columns quantized to whole MW on insert
+GENERATION_QUANTITY_COLUMNS = {
+    'biomass', 'fossil_gas', 'fossil_hard_coal', 'fossil_oil',
+    'hydro_pumped_storage', 'hydro_run_of_river', 'nuclear',
+    'other', 'solar', 'wind_offshore', 'wind_onshore', 'total'
+}
+
+# Upsert used for bulk carbon intensity writes; an actual is never replaced by a forecast
+CARBON_INTENSITY_UPSERT_SQL = """
+    INSERT INTO carbon_intensity_30min_data (timestamp, emissions, is_forecast)
+    VALUES (?, ?, ?)
+    ON CONFLICT(timestamp) DO UPDATE SET
+        emissions = excluded.emissions,
+        is_forecast = excluded.is_forecast
+    WHERE carbon_intensity_30min_data.is_forecast IS NOT 0 OR NOT excluded.is_forecast
+"""
+
+# Column order of the tuples passed to insert_generation_data_bulk
+GENERATION_INSERT_COLUMNS = (
+    'timestamp', 'timestamp_sql', 'settlement_period',
+    'biomass', 'fossil_gas', 'fossil_hard_coal', 'fossil_oil',
+    'hydro_pumped_storage', 'hydro_run_of_river', 'nuclear',
+    'other', 'solar', 'wind_offshore', 'wind_onshore', 'total'
+)
+
+GENERATION_INSERT_SQL = (
+    f"INSERT OR REPLACE INTO generation_30min_data ({', '.join(GENERATION_INSERT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(GENERATION_INSERT_COLUMNS))})"
+)
+
+# Positions in GENERATION_INSERT_COLUMNS holding MW quantities
+_GENERATION_QUANTITY_POSITIONS = tuple(
+    i for i, column in enumerate(GENERATION_INSERT_COLUMNS) if column in GENERATION_QUANTITY_COLUMNS
+)
+
+def quantize_mw(value):
+    """Round a generation quantity to whole MW, keeping None as None"""
+    return None if value is None else int(round(value))
+
 class Database:
     """Database operations for grid data"""
     
     def __init__(self, db_path: str = '/data/grid.db'):
         self.db_path = db_path
+        # Rows written through this instance, so callers can tell whether anything changed
+        self.write_count = 0
         self._ensure_database_exists()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with synchronous=NORMAL, which is safe under WAL and avoids an fsync per commit"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
     def _ensure_database_exists(self):
         """Ensure database file and tables exist"""
         # Ensure directory exists
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         
         # Create database and tables
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
+            # WAL lets the web API read while the tracker writes; the setting persists in the file
+            cursor.execute("PRAGMA journal_mode=WAL")
+            
             # Create carbon_intensity_30min_data table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS carbon_intensity_30min_data (
@@ -60,17 +113,17 @@ class Database:
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     timestamp DATETIME NOT NULL UNIQUE,
                     settlement_period INTEGER,
-                    biomass REAL,
-                    fossil_gas REAL,
-                    fossil_hard_coal REAL,
-                    fossil_oil REAL,
-                    hydro_pumped_storage REAL,
-                    hydro_run_of_river REAL,
-                    nuclear REAL,
-                    other REAL,
-                    solar REAL,
-                    wind_offshore REAL,
-                    wind_onshore REAL,
+                    biomass INTEGER,
+                    fossil_gas INTEGER,
+                    fossil_hard_coal INTEGER,
+                    fossil_oil INTEGER,
+                    hydro_pumped_storage INTEGER,
+                    hydro_run_of_river INTEGER,
+                    nuclear INTEGER,
+                    other INTEGER,
+                    solar INTEGER,
+                    wind_offshore INTEGER,
+                    wind_onshore INTEGER,
                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP
                 )
             """)
@@ -100,7 +153,7 @@ class Database:
             # Normalize timestamp to consistent format
             normalized_timestamp = normalize_timestamp(timestamp)
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 # Check if record exists and whether it's a forecast
@@ -115,7 +168,7 @@ class Database:
                     
                     # If existing record is actual and new record is forecast, don't overwrite
                     if existing_is_forecast == 0 and is_forecast:
-                        logger.debug(f"Skipping forecast update for {timestamp} - actual value already exists")
+                        logger.debug("Skipping forecast update for %s - actual value already exists", timestamp)
                         return True
                     
                     # If existing record is forecast and new record is actual, update
@@ -130,17 +183,49 @@ class Database:
                 conn.commit()
                 
                 if cursor.rowcount > 0:
+                    self.write_count += cursor.rowcount
                     data_type = "forecast" if is_forecast else "actual"
-                    logger.debug(f"Inserted/updated carbon intensity data ({data_type}): {normalized_timestamp} = {emissions}")
+                    logger.debug("Inserted/updated carbon intensity data (%s): %s = %s", data_type, normalized_timestamp, emissions)
                     return True
                 else:
-                    logger.debug(f"Carbon intensity data unchanged: {normalized_timestamp}")
+                    logger.debug("Carbon intensity data unchanged: %s", normalized_timestamp)
                     return True  # Not an error, just no change
                     
         except Exception as e:
             logger.error(f"Failed to insert carbon intensity data: {e}")
             return False
     
+    def insert_carbon_intensity_data_bulk(self, rows: List[Tuple[str, int, bool]]) -> int:
+        """
+        Insert many carbon intensity data points in a single transaction
+        
+        Follows the same rules as insert_carbon_intensity_data: an actual value
+        is never overwritten by a forecast, anything else replaces the stored row.
+        
+        Args:
+            rows: Iterable of (timestamp, emissions, is_forecast) tuples
+            
+        Returns:
+            Number of rows inserted or updated, or -1 on failure
+        """
+        try:
+            params = [(normalize_timestamp(ts), emissions, is_forecast) for ts, emissions, is_forecast in rows]
+            
+            with self._connect() as conn:
+                # Rows skipped by the upsert's WHERE clause are not counted as changes
+                changes_before = conn.total_changes
+                conn.executemany(CARBON_INTENSITY_UPSERT_SQL, params)
+                conn.commit()
+                changed = conn.total_changes - changes_before
+                self.write_count += changed
+                
+                logger.debug(f"Bulk inserted/updated {changed} of {len(params)} carbon intensity rows")
+                return changed
+                
+        except Exception as e:
+            logger.error(f"Failed to bulk insert carbon intensity data: {e}")
+            return -1
+    
     def get_latest_carbon_intensity_data(self, limit: int = 1) -> List[Dict]:
         """
         Get the latest carbon intensity data points
@@ -152,7 +237,7 @@ class Database:
             List of dictionaries with timestamp and emissions
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -169,6 +254,49 @@ class Database:
             logger.error(f"Failed to get latest carbon intensity data: {e}")
             return []
     
+    def get_latest_carbon_intensity_timestamp(self) -> Optional[str]:
+        """
+        Get the newest stored carbon intensity timestamp
+        
+        Returns:
+            Timestamp string, or None if the table is empty
+        """
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                
+                # MAX over the indexed column reads a single index entry
+                cursor.execute("SELECT MAX(timestamp) FROM carbon_intensity_30min_data")
+                return cursor.fetchone()[0]
+                
+        except Exception as e:
+            logger.error(f"Failed to get latest carbon intensity timestamp: {e}")
+            return None
+    
+    def get_actual_carbon_intensity_timestamps(self, start_time: datetime, end_time: datetime) -> set:
+        """
+        Get the timestamps stored as actual (not forecast) values within a time range
+        
+        Args:
+            start_time: Start of the range, inclusive
+            end_time: End of the range, inclusive
+            
+        Returns:
+            Set of normalized timestamps
+        """
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT timestamp FROM carbon_intensity_30min_data
+                    WHERE timestamp BETWEEN ? AND ? AND is_forecast = 0
+                """, (normalize_timestamp(start_time.isoformat()), normalize_timestamp(end_time.isoformat())))
+                return {row[0] for row in cursor}
+                
+        except Exception as e:
+            logger.error(f"Failed to get carbon intensity timestamps: {e}")
+            return set()
+    
     def get_carbon_intensity_history(self, hours: int = 24) -> List[Dict]:
         """
         Get historical carbon intensity data
@@ -180,7 +308,7 @@ class Database:
             List of dictionaries with timestamp and emissions
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -200,7 +328,7 @@ class Database:
     def get_carbon_intensity_data_count(self) -> int:
         """Get total number of carbon intensity data points"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT COUNT(*) FROM carbon_intensity_30min_data")
                 return cursor.fetchone()[0]
@@ -211,7 +339,7 @@ class Database:
     def get_last_carbon_intensity_collection_time(self) -> Optional[str]:
         """Get timestamp of the most recent carbon intensity data collection"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT timestamp 
@@ -236,7 +364,7 @@ class Database:
             List of dictionaries with timestamp and emissions
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -257,7 +385,7 @@ class Database:
     def check_health(self) -> bool:
         """Check if database is healthy and accessible"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT 1")
                 cursor.fetchone()
@@ -271,15 +399,17 @@ class Database:
         Insert or update a row in generation_30min_data using INSERT OR REPLACE to enforce uniqueness on timestamp and timestamp_sql.
         """
         import sqlite3
-        db_path = '/data/grid.db' if not hasattr(self, 'db_path') else self.db_path
+        for column in GENERATION_QUANTITY_COLUMNS.intersection(kwargs):
+            kwargs[column] = quantize_mw(kwargs[column])
         columns = ', '.join(kwargs.keys())
         placeholders = ', '.join(['?'] * len(kwargs))
         sql = f"INSERT OR REPLACE INTO generation_30min_data ({columns}) VALUES ({placeholders})"
         try:
-            with sqlite3.connect(db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(sql, tuple(kwargs.values()))
                 conn.commit()
+                self.write_count += cursor.rowcount
             # Query the database to check if the data was inserted
             cursor.execute("SELECT * FROM generation_30min_data WHERE timestamp = ?", (kwargs['timestamp'],))
             result = cursor.fetchone()
@@ -293,6 +423,49 @@ class Database:
             print(f"[DB] Failed to insert/update generation data: {e}")
             return False
     
+    def insert_generation_data_bulk(self, rows: List[Tuple]) -> int:
+        """
+        Insert or replace many generation rows in a single transaction
+        
+        Args:
+            rows: Tuples of values in GENERATION_INSERT_COLUMNS order
+            
+        Returns:
+            Number of rows inserted or replaced, or -1 on failure
+        """
+        try:
+            params = []
+            for row in rows:
+                row = list(row)
+                for i in _GENERATION_QUANTITY_POSITIONS:
+                    row[i] = quantize_mw(row[i])
+                params.append(row)
+            
+            with self._connect() as conn:
+                changes_before = conn.total_changes
+                conn.executemany(GENERATION_INSERT_SQL, params)
+                conn.commit()
+                changed = conn.total_changes - changes_before
+                self.write_count += changed
+                
+                logger.debug(f"Bulk inserted {changed} of {len(params)} generation rows")
+                return changed
+                
+        except Exception as e:
+            logger.error(f"Failed to bulk insert generation data: {e}")
+            return -1
+    
+    def get_generation_timestamps(self) -> set:
+        """Get the set of normalized timestamps already stored in generation_30min_data"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT timestamp FROM generation_30min_data")
+                return {normalize_timestamp(row[0]) for row in cursor}
+        except Exception as e:
+            logger.error(f"Failed to get generation timestamps: {e}")
+            return set()
+    
     def get_latest_generation_data(self, limit: int = 1) -> List[Dict]:
         """
         Get the latest generation data points
@@ -304,7 +477,7 @@ class Database:
             List of dictionaries with timestamp and generation data
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -326,7 +499,7 @@ class Database:
     def get_generation_stats(self) -> Dict:
         """Get generation database statistics"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 # Total records
@@ -359,7 +532,7 @@ class Database:
     def get_carbon_intensity_stats(self) -> Dict:
         """Get carbon intensity database statistics"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 # Total records
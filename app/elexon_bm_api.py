@@ -1,26 +1,68 @@
 #!/usr/bin/env python3
 """
 Elexon BM Reports API client for generation data
+
+Quantities are reported in MW to at most 1 MW precision and stay well below
+50 GW, so the columnar output holds them as float32 without loss.
 """
 
 import requests
 import logging
+from array import array
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from urllib.parse import urlencode
+from utils.timestamp_utils import normalize_timestamp
+from utils.json_utils import loads
+from utils.api_cache import ttl_cache, RESPONSE_FRESH_SECONDS, RESPONSE_STALE_SECONDS
 
 logger = logging.getLogger(__name__)
 
+# Generation columns in database order
+FUEL_COLUMNS = [
+    'biomass', 'fossil_gas', 'fossil_hard_coal', 'fossil_oil',
+    'hydro_pumped_storage', 'hydro_run_of_river', 'nuclear',
+    'other', 'solar', 'wind_offshore', 'wind_onshore'
+]
+
+# Map Elexon PSR types to our database columns
+PSR_TYPE_COLUMNS = {
+    'Biomass': 'biomass',
+    'Fossil Gas': 'fossil_gas',
+    'Fossil Hard coal': 'fossil_hard_coal',
+    'Fossil Oil': 'fossil_oil',
+    'Hydro Pumped Storage': 'hydro_pumped_storage',
+    'Hydro Run-of-river and poundage': 'hydro_run_of_river',
+    'Nuclear': 'nuclear',
+    'Other': 'other',
+    'Solar': 'solar',
+    'Wind Offshore': 'wind_offshore',
+    'Wind Onshore': 'wind_onshore',
+}
+
+_EMPTY_FUELS = dict.fromkeys(FUEL_COLUMNS)
+
+def _build_point(timestamp: str, settlement_period: Optional[int], generation_data: List[Dict]) -> Dict:
+    """Build a data point with all fuel types from one API entry's generation list"""
+    point = {'timestamp': timestamp, 'settlement_period': settlement_period, **_EMPTY_FUELS}
+    for gen in generation_data:
+        column = PSR_TYPE_COLUMNS.get(gen.get('psrType', ''))
+        if column:
+            point[column] = gen.get('quantity')
+    return point
+
 class ElexonBMAPI:
     """Client for the Elexon BM Reports API"""
     
-    def __init__(self, base_url: str = "https://data.elexon.co.uk/bmrs/api/v1"):
+    def __init__(self, base_url: str = "https://data.elexon.co.uk/bmrs/api/v1", session: Optional[requests.Session] = None):
         self.base_url = base_url
-        self.session = requests.Session()
-        self.session.headers.update({
+        # A session shared with other clients keeps one connection pool for all of them
+        self.session = session or requests.Session()
+        self.headers = {
             'User-Agent': 'GridTracker/1.0',
-            'accept': 'application/json'
-        })
+            'accept': 'application/json',
+            'accept-encoding': 'gzip, deflate'
+        }
     
     def _limit_date_range(self, start_time: datetime, end_time: datetime, max_days: int = 5) -> List[tuple]:
         """
@@ -48,17 +90,67 @@ class ElexonBMAPI:
             
         return chunks
     
-    def get_generation_data(self, start_time: datetime, end_time: datetime) -> List[Dict]:
+    @ttl_cache(fresh=RESPONSE_FRESH_SECONDS, stale=RESPONSE_STALE_SECONDS)
+    def _fetch_entries(self, start_date: str, end_date: str) -> List[Dict]:
+        """Fetch the raw per-type generation entries for one chunk of at most 5 days"""
+        url = f"{self.base_url}/generation/actual/per-type"
+        params = {
+            'from': start_date,
+            'to': end_date,
+            'format': 'json'
+        }
+        
+        logger.debug(f"Fetching generation data from: {url} with params {params}")
+        print(f"Fetching generation data from: {url}")
+        print(f"Params: {params}")
+        
+        response = self.session.get(url, params=params, headers=self.headers, timeout=30)
+        print(f"Response status: {response.status_code}")
+        response.raise_for_status()
+        logger.debug(f"Response content-encoding: {response.headers.get('content-encoding')}")
+        
+        return loads(response.content).get('data', [])
+    
+    def get_generation_data(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        skip_timestamps: Optional[set] = None,
+        raise_transient_errors: bool = False
+    ) -> List[Dict]:
         """
         Get generation data by fuel type for a specific time range
         
         Args:
             start_time: Start of time range
             end_time: End of time range
+            skip_timestamps: Normalized timestamps already stored; matching entries are not parsed
+            raise_transient_errors: Raise timeouts and connection errors instead of
+                returning an empty list, so the caller can retry them
             
         Returns:
             List of data points with timestamp and generation by fuel type
         """
+        return self.get_new_generation_data(start_time, end_time, skip_timestamps, raise_transient_errors)[0]
+    
+    def get_new_generation_data(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        skip_timestamps: Optional[set] = None,
+        raise_transient_errors: bool = False
+    ) -> Tuple[List[Dict], int]:
+        """
+        Get generation data like get_generation_data, also counting the entries skipped
+        
+        An empty list with a skipped count above zero means the API answered but
+        everything was already stored. An empty list with no skipped entries
+        means nothing was received, including when the request failed.
+        
+        Returns:
+            Tuple of (data points, number of entries skipped via skip_timestamps)
+        """
+        skipped_count = 0
         try:
             print(f"Starting API call for range: {start_time} to {end_time}")
             # Split large date ranges into 5-day chunks
@@ -73,82 +165,23 @@ class ElexonBMAPI:
                 end_date = chunk_end.strftime('%Y-%m-%dT%H:%M:%SZ')
                 
                 # Make API request
-                url = f"{self.base_url}/generation/actual/per-type"
-                params = {
-                    'from': start_date,
-                    'to': end_date,
-                    'format': 'json'
-                }
-                
-                logger.debug(f"Fetching generation data from: {url} with params {params}")
-                print(f"Fetching generation data from: {url}")
-                print(f"Params: {params}")
-                
-                response = self.session.get(url, params=params, timeout=30)
-                print(f"Response status: {response.status_code}")
-                response.raise_for_status()
-                
-                data = response.json()
-                # print(f"Raw API response: {data}")
+                entries = self._fetch_entries(start_date, end_date)
                 
                 # Extract and format data points
                 data_points = []
-                print(f"Processing {len(data.get('data', []))} entries from API response")
+                logger.debug("API returned %d entries", len(entries))
                 
-                for entry in data.get('data', []):
+                for entry in entries:
                     timestamp = entry.get('startTime')
                     settlement_period = entry.get('settlementPeriod')
                     generation_data = entry.get('data', [])
                     
-                    print(f"Processing entry: timestamp={timestamp}, settlement_period={settlement_period}, generation_data_count={len(generation_data)}")
+                    if skip_timestamps and timestamp and normalize_timestamp(timestamp) in skip_timestamps:
+                        skipped_count += 1
+                        continue
                     
                     if timestamp and generation_data:
-                        # Create a data point with all fuel types
-                        point = {
-                            'timestamp': timestamp,
-                            'settlement_period': settlement_period,
-                            'biomass': None,
-                            'fossil_gas': None,
-                            'fossil_hard_coal': None,
-                            'fossil_oil': None,
-                            'hydro_pumped_storage': None,
-                            'hydro_run_of_river': None,
-                            'nuclear': None,
-                            'other': None,
-                            'solar': None,
-                            'wind_offshore': None,
-                            'wind_onshore': None
-                        }
-                        
-                        # Map PSR types to our database columns
-                        for gen in generation_data:
-                            psr_type = gen.get('psrType', '')
-                            quantity = gen.get('quantity', None)
-                            
-                            if psr_type == 'Biomass':
-                                point['biomass'] = quantity
-                            elif psr_type == 'Fossil Gas':
-                                point['fossil_gas'] = quantity
-                            elif psr_type == 'Fossil Hard coal':
-                                point['fossil_hard_coal'] = quantity
-                            elif psr_type == 'Fossil Oil':
-                                point['fossil_oil'] = quantity
-                            elif psr_type == 'Hydro Pumped Storage':
-                                point['hydro_pumped_storage'] = quantity
-                            elif psr_type == 'Hydro Run-of-river and poundage':
-                                point['hydro_run_of_river'] = quantity
-                            elif psr_type == 'Nuclear':
-                                point['nuclear'] = quantity
-                            elif psr_type == 'Other':
-                                point['other'] = quantity
-                            elif psr_type == 'Solar':
-                                point['solar'] = quantity
-                            elif psr_type == 'Wind Offshore':
-                                point['wind_offshore'] = quantity
-                            elif psr_type == 'Wind Onshore':
-                                point['wind_onshore'] = quantity
-                        
-                        data_points.append(point)
+                        data_points.append(_build_point(timestamp, settlement_period, generation_data))
                 
                 all_data_points.extend(data_points)
                 logger.info(f"Retrieved {len(data_points)} generation data points for {start_date} to {end_date}")
@@ -176,14 +209,43 @@ class ElexonBMAPI:
                     full_url = f"{self.base_url}/generation/actual/per-type?{urlencode(params)}"
                     print(f"DEBUG: Full API URL to check in browser: {full_url}")
                 
-            return all_data_points
+            return all_data_points, skipped_count
             
         except requests.exceptions.RequestException as e:
+            if raise_transient_errors and isinstance(e, (requests.Timeout, requests.ConnectionError)):
+                raise
             logger.error(f"Elexon BM API request failed: {e}")
-            return []
+            return [], 0
         except Exception as e:
             logger.error(f"Failed to process Elexon BM API response: {e}")
-            return []
+            return [], 0
+    
+    def get_generation_data_soa(self, start_time: datetime, end_time: datetime) -> Dict:
+        """
+        Get generation data by fuel type as columns rather than per-point dicts
+        
+        The columns are built from get_generation_data's points, so fetching,
+        caching and error handling are shared with it.
+        
+        Args:
+            start_time: Start of time range
+            end_time: End of time range
+            
+        Returns:
+            Dict with 'timestamp' (list of ISO strings), 'settlement_period'
+            (int8 array) and one float32 array per fuel column. Missing
+            quantities are stored as NaN.
+        """
+        points = self.get_generation_data(start_time, end_time)
+        columns = {
+            'timestamp': [point['timestamp'] for point in points],
+            'settlement_period': array('b', (point['settlement_period'] or 0 for point in points)),
+        }
+        for fuel in FUEL_COLUMNS:
+            columns[fuel] = array('f', (
+                float('nan') if point[fuel] is None else point[fuel] for point in points
+            ))
+        return columns
     
     def check_health(self) -> bool:
         """
@@ -207,7 +269,7 @@ class ElexonBMAPI:
                 'format': 'json'
             }
             
-            response = self.session.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=params, headers=self.headers, timeout=10)
             response.raise_for_status()
             
             # Check if response has expected structure
@@ -5,34 +5,57 @@ Runs the main loop with scheduled tasks for data collection and monitoring
 """
 
 import time
+import asyncio
 import logging
+import operator
 import signal
 from datetime import datetime, timezone, timedelta
+from functools import partial
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 from config import Config
 from database import Database
-from carbon_intensity_api import CarbonIntensityAPI
-from elexon_bm_api import ElexonBMAPI
-from data_gap_detector import DataGapDetector
+from carbon_intensity_api import CarbonIntensityAPI, MAX_WINDOW_SPAN
+from elexon_bm_api import ElexonBMAPI, FUEL_COLUMNS
+from data_gap_detector import DataGapDetector, GapArray, from_epoch, gap_array_to_tuples
 from utils.backfill_utils import run_backfill_cycle
 from migrate_deduplicate_and_unique import deduplicate_and_add_unique
-from utils.timestamp_utils import iso8601_to_sql_datetime
+from utils.timestamp_utils import iso8601_to_sql_datetime, normalize_timestamp, parse_timestamp
 
-# Configure logging
+# Configure logging to the log file and the console. Timestamps are to the
+# second, which skips the millisecond formatting step on every record.
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+log_formatter = logging.Formatter(LOG_FORMAT)
+log_formatter.default_msec_format = None
+file_handler = logging.FileHandler('/logs/grid_tracker.log')
+file_handler.setFormatter(log_formatter)
+console_handler = logging.StreamHandler()
+console_handler.setFormatter(log_formatter)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler('/logs/grid_tracker.log')
+        file_handler,
+        console_handler
     ]
 )
 logger = logging.getLogger(__name__)
 
-# Prevent duplicate logging
-logger.propagate = False
+# Pulls the fuel quantities out of a generation data point in column order
+_get_fuels = operator.itemgetter(*FUEL_COLUMNS)
+
+# Gap grouping constant, in epoch seconds
+MAX_GAP_RANGE_SECONDS = 5 * 24 * 3600  # Longest range requested per API call
 
 class GridTracker:
     """Main orchestrator for the grid tracking system"""
@@ -40,121 +63,116 @@ class GridTracker:
     def __init__(self):
         self.config = Config()
         self.db = Database()
-        self.carbon_intensity_api = CarbonIntensityAPI()
-        self.elexon_bm_api = ElexonBMAPI()
+        
+        # One pooled HTTP session shared by both API clients, sized for concurrent gap fetches
+        self.http_session = requests.Session()
+        self.http_session.mount('https://', HTTPAdapter(pool_maxsize=self.config.API_CONCURRENCY * 2))
+        self.carbon_intensity_api = CarbonIntensityAPI(session=self.http_session)
+        self.elexon_bm_api = ElexonBMAPI(session=self.http_session)
         self.gap_detector = DataGapDetector()
         
-        # Track last collection times for each data source
-        self.last_carbon_intensity_collection = None
-        self.last_elexon_bm_reports_collection = None
-        self.last_neso_data_portal_collection = None
-        self.last_health_check = None
-        self.last_backfill = None
-        self.last_forecast_update = None
+        # Latest stored carbon intensity timestamp and when it was read (monotonic)
+        self._cached_latest_timestamp = None
+        self._cached_latest_read_at = 0.0
         
-        # Control flag for graceful shutdown
-        self.running = True
+        # Last gap scan per table as (row_count, gaps)
+        self._gap_scan_cache = {}
         
-        # Setup signal handlers
-        signal.signal(signal.SIGINT, self._signal_handler)
-        signal.signal(signal.SIGTERM, self._signal_handler)
-    
-    def _signal_handler(self, signum, frame):
-        """Handle shutdown signals gracefully"""
-        logger.info(f"Received signal {signum}, shutting down gracefully...")
-        self.running = False
-    
-    def should_run_carbon_intensity_collection(self) -> bool:
-        """Check if it's time to collect carbon intensity data"""
-        if not self.last_carbon_intensity_collection:
-            return True
+        # Last health check record counts as (write_count, carbon_total, generation_total)
+        self._health_check_counts = None
         
-        time_since_last = time.time() - self.last_carbon_intensity_collection
-        return time_since_last >= self.config.CARBON_INTENSITY_COLLECTION_INTERVAL
-    
-    def should_run_elexon_bm_collection(self) -> bool:
-        """Check if it's time to collect Elexon BM generation data"""
-        if not self.last_elexon_bm_reports_collection:
-            return True
+        # Generation timestamps already stored, so overlapping fetches skip them
+        self._seen_generation = self.db.get_generation_timestamps()
         
-        time_since_last = time.time() - self.last_elexon_bm_reports_collection
-        return time_since_last >= self.config.ELEXON_BM_REPORTS_COLLECTION_INTERVAL
-    
-    def should_run_health_check(self) -> bool:
-        """Check if it's time to run health check"""
-        if not self.last_health_check:
-            return True
+        # Per-table API and database insert functions used by the backfill. The API
+        # functions raise timeouts and connection errors so the backfill can retry them
+        self._backfill_api_functions = {
+            'carbon_intensity_30min_data': partial(self.carbon_intensity_api.get_intensity_data, raise_transient_errors=True),
+            'generation_30min_data': partial(self.elexon_bm_api.get_generation_data, raise_transient_errors=True)
+        }
+        self._backfill_db_insert_functions = {
+            'carbon_intensity_30min_data': self._store_carbon_intensity_points,
+            'generation_30min_data': self._store_generation_points
+        }
         
-        time_since_last = time.time() - self.last_health_check
-        return time_since_last >= self.config.HEALTH_CHECK_INTERVAL
-    
-    def should_run_backfill(self) -> bool:
-        """Check if it's time to run backfill"""
-        if not self.last_backfill:
-            return True
+        # Recurring tasks as (name, task, interval, retry_on_failure); each
+        # runs in its own asyncio task so their blocking I/O overlaps
+        self._jobs = [
+            ("Carbon intensity collection", self.collect_carbon_intensity_data,
+             self.config.CARBON_INTENSITY_COLLECTION_INTERVAL, True),
+            ("Elexon BM collection", self.collect_elexon_bm_data,
+             self.config.ELEXON_BM_REPORTS_COLLECTION_INTERVAL, True),
+            ("Health check", self.run_health_check,
+             self.config.HEALTH_CHECK_INTERVAL, False),
+            ("Backfill", self.run_backfill,
+             self.config.BACKFILL_INTERVAL, False),
+            ("Forecast update", self.run_forecast_update,
+             self.config.FORECAST_UPDATE_INTERVAL, False),
+        ]
         
-        time_since_last = time.time() - self.last_backfill
-        return time_since_last >= self.config.BACKFILL_INTERVAL
-    
-    def should_run_forecast_update(self) -> bool:
-        """Check if it's time to run forecast update"""
-        if not self.last_forecast_update:
-            return True
+        # Set by the signal handler; jobs stop waiting for their next run at once
+        self._shutdown = asyncio.Event()
         
-        time_since_last = time.time() - self.last_forecast_update
-        return time_since_last >= self.config.FORECAST_UPDATE_INTERVAL
+        # Caps how many jobs run at once, keeping SQLite write contention down
+        self._job_slots = asyncio.Semaphore(self.config.MAX_CONCURRENT_JOBS)
+    
+    def _signal_handler(self, signum):
+        """Handle shutdown signals gracefully"""
+        logger.info("Received signal %s, shutting down gracefully...", signum)
+        self._shutdown.set()
     
     def collect_carbon_intensity_data(self) -> bool:
         """Collect carbon intensity data with smart gap detection"""
         try:
             logger.info("Starting carbon intensity data collection...")
-            print("--------------------------------")
-            print("Carbon intensity data collection started")
-            print("--------------------------------\n")
 
-            # Get latest data from database
-            latest_data = self.db.get_latest_carbon_intensity_data(limit=1)
+            # Get latest timestamp, from the cache if it was read recently. Only our
+            # own inserts move it forward and those refresh the cache.
+            if (self._cached_latest_timestamp is not None
+                    and time.monotonic() - self._cached_latest_read_at < self.config.LATEST_TIMESTAMP_CACHE_TTL):
+                latest_timestamp_str = self._cached_latest_timestamp
+            else:
+                latest_timestamp_str = self.db.get_latest_carbon_intensity_timestamp()
+                self._cached_latest_timestamp = latest_timestamp_str
+                self._cached_latest_read_at = time.monotonic()
             current_time = datetime.now(timezone.utc)
             
-            if latest_data:
-                # Parse the latest timestamp
-                latest_timestamp_str = latest_data[0]['timestamp']
-                
+            # Never ask the API for more than it serves in one request
+            fallback_window = min(self.config.CARBON_INTENSITY_FALLBACK_WINDOW, MAX_WINDOW_SPAN)
+            fallback_hours = fallback_window.total_seconds() / 3600
+            
+            if latest_timestamp_str:
                 try:
-                    if latest_timestamp_str.endswith('Z'):
-                        latest_timestamp = datetime.fromisoformat(latest_timestamp_str.replace('Z', '+00:00'))
-                    else:
-                        latest_timestamp = datetime.fromisoformat(latest_timestamp_str)
+                    latest_timestamp = parse_timestamp(latest_timestamp_str)
                     
                     # Check if data is fresh enough (< 60 mins old)
                     time_since_latest = current_time - latest_timestamp
                     
                     if time_since_latest.total_seconds() < 1800:  # 30 minutes
-                        print(f"Carbon intensity data is fresh ({time_since_latest.total_seconds()/60:.1f} minutes old), skipping collection")
-                        logger.info(f"Carbon intensity data is fresh ({time_since_latest.total_seconds()/60:.1f} minutes old), skipping collection")
+                        logger.info("Carbon intensity data is fresh (%.1f minutes old), skipping collection", time_since_latest.total_seconds()/60)
                         return True
                     
-                    # Data is stale, fetch from latest timestamp to current time
-                    start_time = latest_timestamp
+                    # Data is stale, fetch from latest timestamp to current time. Anything
+                    # older than one API window is left for the health check's gap filling
+                    start_time = max(latest_timestamp, current_time - MAX_WINDOW_SPAN)
                     end_time = current_time
                     gap_hours = time_since_latest.total_seconds() / 3600
                     
-                    print(f"Carbon intensity data is {gap_hours:.1f} hours old, fetching missing data")
-                    logger.info(f"Carbon intensity data is {gap_hours:.1f} hours old, fetching missing data")
+                    logger.info("Carbon intensity data is %.1f hours old, fetching missing data", gap_hours)
                     
                 except ValueError as e:
-                    logger.warning(f"Could not parse latest timestamp {latest_timestamp_str}: {e}")
-                    # If we can't parse the timestamp, fetch last 6 hours
-                    start_time = current_time - timedelta(hours=6)
+                    logger.warning("Could not parse latest timestamp %s: %s", latest_timestamp_str, e)
+                    # If we can't parse the timestamp, fetch the fallback window
+                    start_time = current_time - fallback_window
                     end_time = current_time
-                    gap_hours = 6
-                    logger.info("Could not parse latest timestamp, fetching last 6 hours of data")
+                    gap_hours = fallback_hours
+                    logger.info("Could not parse latest timestamp, fetching last %.1f hours of data", fallback_hours)
             else:
-                # Database is empty, fetch last 6 hours
-                start_time = current_time - timedelta(hours=6)
+                # Database is empty, fetch the fallback window
+                start_time = current_time - fallback_window
                 end_time = current_time
-                gap_hours = 6
-                logger.info("Database empty, fetching last 6 hours of carbon intensity data")
+                gap_hours = fallback_hours
+                logger.info("Database empty, fetching last %.1f hours of carbon intensity data", fallback_hours)
             
             # Fetch data from API
             data_points = self.carbon_intensity_api.get_intensity_data(start_time, end_time)
@@ -164,30 +182,27 @@ class GridTracker:
                 return False
             
             # Store data in database
-            inserted_count = 0
-            for point in data_points:
-                success = self.db.insert_carbon_intensity_data(
-                    timestamp=point['timestamp'],
-                    emissions=point['emissions'],
-                    is_forecast=point.get('is_forecast', False)
-                )
-                if success:
-                    inserted_count += 1
+            rows = [(p['timestamp'], p['emissions'], p.get('is_forecast', False)) for p in data_points]
+            inserted_count = self.db.insert_carbon_intensity_data_bulk(rows)
+            if inserted_count < 0:
+                return False
             
-            logger.info(f"Carbon intensity collection complete: {inserted_count} points collected to fill {gap_hours:.1f} hour gap")
+            newest = normalize_timestamp(max(p['timestamp'] for p in data_points))
+            if self._cached_latest_timestamp is None or newest > self._cached_latest_timestamp:
+                self._cached_latest_timestamp = newest
+            self._cached_latest_read_at = time.monotonic()
+            
+            logger.info("Carbon intensity collection complete: %s points collected to fill %.1f hour gap", inserted_count, gap_hours)
             return True
             
         except Exception as e:
-            logger.error(f"Carbon intensity data collection failed: {e}")
+            logger.error("Carbon intensity data collection failed: %s", e)
             return False
     
     def collect_elexon_bm_data(self) -> bool:
         """Collect Elexon BM generation data with smart gap detection"""
         try:
             logger.info("Starting Elexon BM generation data collection...")
-            print("--------------------------------")
-            print("Elexon BM generation data collection started")
-            print("--------------------------------\n")
 
             # Get latest data from database
             latest_data = self.db.get_latest_generation_data(limit=1)
@@ -198,17 +213,13 @@ class GridTracker:
                 latest_timestamp_str = latest_data[0]['timestamp']
                 
                 try:
-                    if latest_timestamp_str.endswith('Z'):
-                        latest_timestamp = datetime.fromisoformat(latest_timestamp_str.replace('Z', '+00:00'))
-                    else:
-                        latest_timestamp = datetime.fromisoformat(latest_timestamp_str)
+                    latest_timestamp = parse_timestamp(latest_timestamp_str)
                     
                     # Check if data is fresh enough (< 2 hours old)
                     time_since_latest = current_time - latest_timestamp
                     
                     if time_since_latest.total_seconds() < 1800:  # 30 minutes
-                        print(f"Generation data is fresh ({time_since_latest.total_seconds()/3600:.1f} hours old), skipping collection")
-                        logger.info(f"Generation data is fresh ({time_since_latest.total_seconds()/3600:.1f} hours old), skipping collection")
+                        logger.info("Generation data is fresh (%.1f hours old), skipping collection", time_since_latest.total_seconds()/3600)
                         return True
                     
                     # Data is stale, fetch from latest timestamp to current time
@@ -216,11 +227,18 @@ class GridTracker:
                     end_time = current_time
                     gap_hours = time_since_latest.total_seconds() / 3600
                     
-                    print(f"Generation data is {gap_hours:.1f} hours old, fetching missing data")
-                    logger.info(f"Generation data is {gap_hours:.1f} hours old, fetching missing data")
+                    # Nothing newer than the latest row is stored, so any such seen
+                    # timestamps were deleted since and must be fetched again
+                    latest_key = normalize_timestamp(latest_timestamp_str)
+                    deleted = [ts for ts in self._seen_generation if ts > latest_key]
+                    if deleted:
+                        logger.info("Forgetting %s deleted generation timestamps after %s", len(deleted), latest_key)
+                        self._seen_generation.difference_update(deleted)
+                    
+                    logger.info("Generation data is %.1f hours old, fetching missing data", gap_hours)
                     
                 except ValueError as e:
-                    logger.warning(f"Could not parse latest timestamp {latest_timestamp_str}: {e}")
+                    logger.warning("Could not parse latest timestamp %s: %s", latest_timestamp_str, e)
                     # If we can't parse the timestamp, fetch last 24 hours
                     start_time = current_time - timedelta(hours=24)
                     end_time = current_time
@@ -234,50 +252,50 @@ class GridTracker:
                 logger.info("Database empty, fetching last 24 hours of generation data")
             
             # Fetch data from API
-            data_points = self.elexon_bm_api.get_generation_data(start_time, end_time)
+            data_points, skipped_count = self.elexon_bm_api.get_new_generation_data(
+                start_time, end_time, skip_timestamps=self._seen_generation
+            )
             
             if not data_points:
+                if skipped_count:
+                    # Everything received is already stored; nothing new has been published yet
+                    logger.info("No new generation data points received from API (%s already stored)", skipped_count)
+                    return True
                 logger.warning("No generation data points received from API")
                 return False
             
-            # Store data in database
-            inserted_count = 0
-            for point in data_points:
-                # Calculate total as the sum of all generation sources (ignore None)
-                total = sum(
-                    point[src] for src in [
-                        'biomass', 'fossil_gas', 'fossil_hard_coal', 'fossil_oil',
-                        'hydro_pumped_storage', 'hydro_run_of_river', 'nuclear',
-                        'other', 'solar', 'wind_offshore', 'wind_onshore'
-                    ] if point[src] is not None
-                )
-                success = self.db.insert_generation_data(
-                    timestamp=point['timestamp'],
-                    timestamp_sql=iso8601_to_sql_datetime(point['timestamp']),
-                    settlement_period=point['settlement_period'],
-                    biomass=point['biomass'],
-                    fossil_gas=point['fossil_gas'],
-                    fossil_hard_coal=point['fossil_hard_coal'],
-                    fossil_oil=point['fossil_oil'],
-                    hydro_pumped_storage=point['hydro_pumped_storage'],
-                    hydro_run_of_river=point['hydro_run_of_river'],
-                    nuclear=point['nuclear'],
-                    other=point['other'],
-                    solar=point['solar'],
-                    wind_offshore=point['wind_offshore'],
-                    wind_onshore=point['wind_onshore'],
-                    total=total
-                )
-                if success:
-                    inserted_count += 1
+            # Store data in database in one transaction
+            inserted_count = self.db.insert_generation_data_bulk(
+                [self._generation_row(point) for point in data_points]
+            )
+            if inserted_count < 0:
+                return False
+            self._seen_generation.update(normalize_timestamp(point['timestamp']) for point in data_points)
             
-            logger.info(f"Elexon BM collection complete: {inserted_count} points collected to fill {gap_hours:.1f} hour gap")
+            logger.info("Elexon BM collection complete: %s points collected to fill %.1f hour gap", inserted_count, gap_hours)
             return True
             
         except Exception as e:
-            logger.error(f"Elexon BM data collection failed: {e}")
+            logger.error("Elexon BM data collection failed: %s", e)
             return False
     
+    def _generation_row(self, point: dict) -> tuple:
+        """Build an insert_generation_data_bulk row, with total as the sum of reported sources"""
+        fuels = _get_fuels(point)
+        total = sum(value for value in fuels if value is not None)
+        timestamp = point['timestamp']
+        return (timestamp, iso8601_to_sql_datetime(timestamp), point['settlement_period'], *fuels, total)
+    
+    def _store_carbon_intensity_points(self, data_points: List[dict]) -> int:
+        """Store carbon intensity points in one transaction, returning rows written or -1 on error"""
+        return self.db.insert_carbon_intensity_data_bulk(
+            [(p['timestamp'], p['emissions'], p.get('is_forecast', False)) for p in data_points]
+        )
+    
+    def _store_generation_points(self, data_points: List[dict]) -> int:
+        """Store generation points in one transaction, returning rows written or -1 on error"""
+        return self.db.insert_generation_data_bulk([self._generation_row(point) for point in data_points])
+    
     def run_health_check(self) -> bool:
         """Run system health check"""
         try:
@@ -286,125 +304,141 @@ class GridTracker:
             # Check database health
             db_healthy = self.db.check_health()
             if db_healthy:
-                # Carbon intensity stats
-                carbon_stats = self.db.get_carbon_intensity_stats()
-                print(f"Database healthy: {carbon_stats['total_records']} carbon intensity records")
-                
-                # Generation stats
-                generation_stats = self.db.get_generation_stats()
-                print(f"Database healthy: {generation_stats['total_records']} generation records")
+                # Record counts can only change through writes, so the stats queries
+                # are skipped when nothing has been written since the last check
+                write_count = self.db.write_count
+                if self._health_check_counts and self._health_check_counts[0] == write_count:
+                    _, carbon_total, generation_total = self._health_check_counts
+                    logger.info("No database writes since last health check, reusing record counts")
+                else:
+                    carbon_total = self.db.get_carbon_intensity_stats()['total_records']
+                    generation_total = self.db.get_generation_stats()['total_records']
+                    self._health_check_counts = (write_count, carbon_total, generation_total)
+                logger.info("Database healthy: %s carbon intensity records", carbon_total)
+                logger.info("Database healthy: %s generation records", generation_total)
                 
-                # Check for data gaps in carbon intensity
-                carbon_gaps = self.gap_detector.detect_data_gaps(
-                    table_name='carbon_intensity_30min_data',
-                    granularity_minutes=30
-                )
+                # Check for data gaps in carbon intensity. Known gaps are reused while the
+                # row count is unchanged, but filling is always retried
+                carbon_gaps = self._detect_gaps_if_changed('carbon_intensity_30min_data', carbon_total)
                 
-                if carbon_gaps:
-                    print(f"Found {len(carbon_gaps)} data gaps in carbon intensity data:")
-                    for gap_start, gap_end in carbon_gaps[:5]:  # Show first 5 gaps
-                        print(f"  Missing: {gap_start.isoformat()}")
-                    if len(carbon_gaps) > 5:
-                        print(f"  ... and {len(carbon_gaps) - 5} more gaps")
+                if carbon_gaps.starts:
+                    logger.info("Found %s data gaps in carbon intensity data", len(carbon_gaps.starts))
+                    if logger.isEnabledFor(logging.DEBUG):
+                        # First 5 gaps, as one record
+                        logger.debug("Missing: %s", ", ".join(from_epoch(gap_start).isoformat() for gap_start in carbon_gaps.starts[:5]))
                     
                     # Attempt to fill the gaps
-                    print("Attempting to fill carbon intensity gaps...")
-                    gap_fill_success = self.fill_data_gaps('carbon_intensity_30min_data', 30)
+                    logger.info("Attempting to fill carbon intensity gaps...")
+                    gap_fill_success = self.fill_data_gaps('carbon_intensity_30min_data', 30, gaps=carbon_gaps)
                     if gap_fill_success:
-                        print("Carbon intensity gap filling completed")
+                        logger.info("Carbon intensity gap filling completed")
                     else:
-                        print("Carbon intensity gap filling failed")
+                        logger.warning("Carbon intensity gap filling failed")
                 else:
-                    print("No data gaps detected in carbon intensity data")
+                    logger.info("No data gaps detected in carbon intensity data")
                 
                 # Check for data gaps in generation
-                generation_gaps = self.gap_detector.detect_data_gaps(
-                    table_name='generation_30min_data',
-                    granularity_minutes=30
-                )
+                generation_gaps = self._detect_gaps_if_changed('generation_30min_data', generation_total)
                 
-                if generation_gaps:
-                    print(f"Found {len(generation_gaps)} data gaps in generation data:")
-                    for gap_start, gap_end in generation_gaps[:5]:  # Show first 5 gaps
-                        print(f"  Missing: {gap_start.isoformat()}")
-                    if len(generation_gaps) > 5:
-                        print(f"  ... and {len(generation_gaps) - 5} more gaps")
+                if generation_gaps.starts:
+                    logger.info("Found %s data gaps in generation data", len(generation_gaps.starts))
+                    if logger.isEnabledFor(logging.DEBUG):
+                        # First 5 gaps, as one record
+                        logger.debug("Missing: %s", ", ".join(from_epoch(gap_start).isoformat() for gap_start in generation_gaps.starts[:5]))
                     
                     # Attempt to fill the gaps
-                    print("Attempting to fill generation gaps...")
-                    gap_fill_success = self.fill_generation_gaps('generation_30min_data', 30)
+                    logger.info("Attempting to fill generation gaps...")
+                    gap_fill_success = self.fill_generation_gaps('generation_30min_data', 30, gaps=generation_gaps)
                     if gap_fill_success:
-                        print("Generation gap filling completed")
+                        logger.info("Generation gap filling completed")
                     else:
-                        print("Generation gap filling failed")
+                        logger.warning("Generation gap filling failed")
                 else:
-                    print("No data gaps detected in generation data")
+                    logger.info("No data gaps detected in generation data")
                 
             else:
-                print("Database health check failed")
+                logger.warning("Database health check failed")
+            
+            # Check API health, probing both APIs at once
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                carbon_probe = executor.submit(self.carbon_intensity_api.check_health)
+                elexon_probe = executor.submit(self.elexon_bm_api.check_health)
+                carbon_api_healthy = carbon_probe.result()
+                elexon_api_healthy = elexon_probe.result()
             
-            # Check API health
-            carbon_api_healthy = self.carbon_intensity_api.check_health()
             if carbon_api_healthy:
-                print("Carbon Intensity API healthy")
+                logger.info("Carbon Intensity API healthy")
             else:
-                print("Carbon Intensity API health check failed")
+                logger.warning("Carbon Intensity API health check failed")
             
-            elexon_api_healthy = self.elexon_bm_api.check_health()
             if elexon_api_healthy:
-                print("Elexon BM API healthy")
+                logger.info("Elexon BM API healthy")
             else:
-                print("Elexon BM API health check failed")
+                logger.warning("Elexon BM API health check failed")
             
             logger.info("Health check complete")
             return db_healthy and carbon_api_healthy and elexon_api_healthy
             
         except Exception as e:
-            logger.error(f"Health check failed: {e}")
+            logger.error("Health check failed: %s", e)
             return False
     
-    def detect_and_report_gaps(self, table_name: str, granularity_minutes: int) -> List[Tuple[datetime, datetime]]:
+    def _detect_gaps_if_changed(self, table_name: str, row_count: int) -> GapArray:
+        """Detect gaps, reusing the previous result if the table's row count is unchanged"""
+        cached = self._gap_scan_cache.get(table_name)
+        if cached and cached[0] == row_count:
+            logger.info("No new rows in %s since last gap scan, reusing %s known gaps", table_name, len(cached[1].starts))
+            return cached[1]
+        
+        gaps = self.gap_detector.detect_gap_array(
+            table_name=table_name,
+            granularity_minutes=30
+        )
+        self._gap_scan_cache[table_name] = (row_count, gaps)
+        return gaps
+    
+    def detect_and_report_gaps(self, table_name: str, granularity_minutes: int) -> GapArray:
         """Detect and report gaps in data"""
         try:
-            gaps = self.gap_detector.detect_data_gaps(
+            gaps = self.gap_detector.detect_gap_array(
                 table_name=table_name,
                 granularity_minutes=granularity_minutes
             )
             
-            if gaps:
-                logger.info(f"Found {len(gaps)} gaps in {table_name}")
-                print(f"Found {len(gaps)} gaps in {table_name}:")
-                for gap_start, gap_end in gaps[:10]:  # Show first 10 gaps
-                    print(f"  Missing: {gap_start.isoformat()}")
-                if len(gaps) > 10:
-                    print(f"  ... and {len(gaps) - 10} more gaps")
+            if gaps.starts:
+                logger.info("Found %s gaps in %s", len(gaps.starts), table_name)
+                if logger.isEnabledFor(logging.DEBUG):
+                    # First 10 gaps, as one record
+                    logger.debug(
+                        "Missing: %s%s",
+                        ", ".join(from_epoch(gap_start).isoformat() for gap_start in gaps.starts[:10]),
+                        f" ... and {len(gaps.starts) - 10} more gaps" if len(gaps.starts) > 10 else ""
+                    )
             else:
-                logger.info(f"No gaps found in {table_name}")
-                print(f"No gaps found in {table_name}")
+                logger.info("No gaps found in %s", table_name)
             
             return gaps
             
         except Exception as e:
-            logger.error(f"Error detecting gaps in {table_name}: {e}")
-            return []
+            logger.error("Error detecting gaps in %s: %s", table_name, e)
+            return GapArray((), ())
     
-    def fill_data_gaps(self, table_name: str, granularity_minutes: int) -> bool:
-        """Detect and fill gaps in data"""
+    def fill_data_gaps(self, table_name: str, granularity_minutes: int,
+                       gaps: Optional[GapArray] = None) -> bool:
+        """Detect and fill gaps in data, skipping detection if gaps are supplied"""
         try:
-            logger.info(f"Checking for gaps in {table_name}...")
-            
-            # Detect gaps
-            gaps = self.gap_detector.detect_data_gaps(
-                table_name=table_name,
-                granularity_minutes=granularity_minutes
-            )
+            if gaps is None:
+                logger.info("Checking for gaps in %s...", table_name)
+                gaps = self.gap_detector.detect_gap_array(
+                    table_name=table_name,
+                    granularity_minutes=granularity_minutes
+                )
             
-            if not gaps:
-                logger.info(f"No gaps found in {table_name}")
+            if not gaps.starts:
+                logger.info("No gaps found in %s", table_name)
                 return True
             
-            logger.info(f"Found {len(gaps)} gaps in {table_name}, attempting to fill...")
-            print(f"Found {len(gaps)} gaps in carbon intensity data, attempting to fill...")
+            logger.info("Found %s gaps in %s, attempting to fill...", len(gaps.starts), table_name)
             
             # Group consecutive gaps to minimize API calls
             gap_ranges = self._group_consecutive_gaps(gaps, granularity_minutes)
@@ -412,64 +446,66 @@ class GridTracker:
             # Limit to most recent 100 chunks to avoid too many API calls
             MAX_GAP_CHUNKS = 100
             if len(gap_ranges) > MAX_GAP_CHUNKS:
-                logger.info(f"Limiting gap filling to most recent {MAX_GAP_CHUNKS} chunks (out of {len(gap_ranges)} total)")
-                print(f"Limiting gap filling to most recent {MAX_GAP_CHUNKS} chunks (out of {len(gap_ranges)} total)")
+                logger.info("Limiting gap filling to most recent %s chunks (out of %s total)", MAX_GAP_CHUNKS, len(gap_ranges))
                 gap_ranges = gap_ranges[-MAX_GAP_CHUNKS:]
             
-            total_filled = 0
-            for gap_start, gap_end in gap_ranges:
-                try:
-                    # Fetch data for this gap range
-                    data_points = self.carbon_intensity_api.get_intensity_data(gap_start, gap_end)
-                    
-                    if data_points:
-                        # Store the data
-                        inserted_count = 0
-                        for point in data_points:
-                            success = self.db.insert_carbon_intensity_data(
-                                timestamp=point['timestamp'],
-                                emissions=point['emissions'],
-                                is_forecast=point.get('is_forecast', False)
-                            )
-                            if success:
-                                inserted_count += 1
-                        
-                        total_filled += inserted_count
-                        logger.info(f"Filled gap {gap_start} to {gap_end}: {inserted_count} points")
-                        print(f"  Filled gap {gap_start.strftime('%Y-%m-%d %H:%M')} to {gap_end.strftime('%Y-%m-%d %H:%M')}: {inserted_count} points")
-                    else:
-                        logger.warning(f"No data received for gap {gap_start} to {gap_end}")
-                        print(f"  No data received for gap {gap_start.strftime('%Y-%m-%d %H:%M')} to {gap_end.strftime('%Y-%m-%d %H:%M')}")
+            # Gap ranges close together are fetched with one request per cluster.
+            # Clusters are fetched concurrently, then stored in one transaction
+            clusters = self.carbon_intensity_api.cluster_windows(gap_ranges)
+            rows = []
+            with ThreadPoolExecutor(max_workers=self.config.API_CONCURRENCY) as executor:
+                futures = {
+                    executor.submit(self.carbon_intensity_api.get_intensity_data_windows, cluster): cluster
+                    for cluster in clusters
+                }
+                for future in as_completed(futures):
+                    cluster = futures[future]
+                    gap_start, gap_end = cluster[0][0], cluster[-1][1]
+                    try:
+                        data_points = future.result()
                         
-                except Exception as e:
-                    logger.error(f"Error filling gap {gap_start} to {gap_end}: {e}")
-                    print(f"  Error filling gap {gap_start.strftime('%Y-%m-%d %H:%M')} to {gap_end.strftime('%Y-%m-%d %H:%M')}: {e}")
+                        if data_points:
+                            rows.extend((p['timestamp'], p['emissions'], p.get('is_forecast', False)) for p in data_points)
+                            logger.debug("Fetched %s gaps from %s to %s: %s points", len(cluster), gap_start, gap_end, len(data_points))
+                        else:
+                            logger.warning("No data received for %s gaps from %s to %s", len(cluster), gap_start, gap_end)
+                            
+                    except Exception as e:
+                        logger.error("Error filling %s gaps from %s to %s: %s", len(cluster), gap_start, gap_end, e)
+            
+            # Clusters return neighbouring periods too; skip those already stored as actuals
+            if rows:
+                stored = self.db.get_actual_carbon_intensity_timestamps(
+                    gap_ranges[0][0] - timedelta(minutes=granularity_minutes),
+                    gap_ranges[-1][1] + timedelta(minutes=granularity_minutes)
+                )
+                rows = [row for row in rows if normalize_timestamp(row[0]) not in stored]
             
-            logger.info(f"Gap filling complete: {total_filled} points filled")
-            print(f"Gap filling complete: {total_filled} points filled")
+            total_filled = max(self.db.insert_carbon_intensity_data_bulk(rows), 0) if rows else 0
+            
+            logger.info("Gap filling complete: %s points filled from %s gaps with %s requests", total_filled, len(gap_ranges), len(clusters))
             return True
             
         except Exception as e:
-            logger.error(f"Error in gap filling: {e}")
+            logger.error("Error in gap filling: %s", e)
             return False
     
-    def fill_generation_gaps(self, table_name: str, granularity_minutes: int) -> bool:
-        """Detect and fill gaps in generation data"""
+    def fill_generation_gaps(self, table_name: str, granularity_minutes: int,
+                             gaps: Optional[GapArray] = None) -> bool:
+        """Detect and fill gaps in generation data, skipping detection if gaps are supplied"""
         try:
-            logger.info(f"Checking for gaps in {table_name}...")
-            
-            # Detect gaps
-            gaps = self.gap_detector.detect_data_gaps(
-                table_name=table_name,
-                granularity_minutes=granularity_minutes
-            )
+            if gaps is None:
+                logger.info("Checking for gaps in %s...", table_name)
+                gaps = self.gap_detector.detect_gap_array(
+                    table_name=table_name,
+                    granularity_minutes=granularity_minutes
+                )
             
-            if not gaps:
-                logger.info(f"No gaps found in {table_name}")
+            if not gaps.starts:
+                logger.info("No gaps found in %s", table_name)
                 return True
             
-            logger.info(f"Found {len(gaps)} gaps in {table_name}")
-            print(f"Found {len(gaps)} gaps in {table_name}")
+            logger.info("Found %s gaps in %s", len(gaps.starts), table_name)
             
             # Group consecutive gaps for efficient filling
             gap_ranges = self._group_consecutive_gaps(gaps, granularity_minutes)
@@ -477,263 +513,206 @@ class GridTracker:
             # Limit to most recent 100 chunks to avoid too many API calls
             MAX_GAP_CHUNKS = 100
             if len(gap_ranges) > MAX_GAP_CHUNKS:
-                logger.info(f"Limiting gap filling to most recent {MAX_GAP_CHUNKS} chunks (out of {len(gap_ranges)} total)")
-                print(f"Limiting gap filling to most recent {MAX_GAP_CHUNKS} chunks (out of {len(gap_ranges)} total)")
+                logger.info("Limiting gap filling to most recent %s chunks (out of %s total)", MAX_GAP_CHUNKS, len(gap_ranges))
                 gap_ranges = gap_ranges[-MAX_GAP_CHUNKS:]
             
-            total_filled = 0
-            for gap_start, gap_end in gap_ranges:
-                try:
-                    # Fetch data for this gap range
-                    data_points = self.elexon_bm_api.get_generation_data(gap_start, gap_end)
-                    
-                    if data_points:
-                        # Store the data
-                        inserted_count = 0
-                        for point in data_points:
-                            # Calculate total as the sum of all generation sources (ignore None)
-                            total = sum(
-                                point[src] for src in [
-                                    'biomass', 'fossil_gas', 'fossil_hard_coal', 'fossil_oil',
-                                    'hydro_pumped_storage', 'hydro_run_of_river', 'nuclear',
-                                    'other', 'solar', 'wind_offshore', 'wind_onshore'
-                                ] if point[src] is not None
-                            )
-                            success = self.db.insert_generation_data(
-                                timestamp=point['timestamp'],
-                                timestamp_sql=iso8601_to_sql_datetime(point['timestamp']),
-                                settlement_period=point['settlement_period'],
-                                biomass=point['biomass'],
-                                fossil_gas=point['fossil_gas'],
-                                fossil_hard_coal=point['fossil_hard_coal'],
-                                fossil_oil=point['fossil_oil'],
-                                hydro_pumped_storage=point['hydro_pumped_storage'],
-                                hydro_run_of_river=point['hydro_run_of_river'],
-                                nuclear=point['nuclear'],
-                                other=point['other'],
-                                solar=point['solar'],
-                                wind_offshore=point['wind_offshore'],
-                                wind_onshore=point['wind_onshore'],
-                                total=total
-                            )
-                            if success:
-                                inserted_count += 1
+            # Fetch all gap ranges concurrently, then store them in one transaction. The
+            # gaps are by definition not stored, so no timestamps are skipped here
+            rows = []
+            filled_timestamps = []
+            with ThreadPoolExecutor(max_workers=self.config.API_CONCURRENCY) as executor:
+                futures = {
+                    executor.submit(self.elexon_bm_api.get_generation_data, gap_start, gap_end): (gap_start, gap_end)
+                    for gap_start, gap_end in gap_ranges
+                }
+                for future in as_completed(futures):
+                    gap_start, gap_end = futures[future]
+                    try:
+                        data_points = future.result()
                         
-                        total_filled += inserted_count
-                        logger.info(f"Filled generation gap {gap_start} to {gap_end}: {inserted_count} points")
-                        print(f"  Filled generation gap {gap_start.strftime('%Y-%m-%d %H:%M')} to {gap_end.strftime('%Y-%m-%d %H:%M')}: {inserted_count} points")
-                    else:
-                        logger.warning(f"No generation data received for gap {gap_start} to {gap_end}")
-                        print(f"  No generation data received for gap {gap_start.strftime('%Y-%m-%d %H:%M')} to {gap_end.strftime('%Y-%m-%d %H:%M')}")
+                        if data_points:
+                            rows.extend(self._generation_row(point) for point in data_points)
+                            filled_timestamps.extend(point['timestamp'] for point in data_points)
+                            logger.debug("Fetched generation gap %s to %s: %s points", gap_start, gap_end, len(data_points))
+                        else:
+                            logger.warning("No generation data received for gap %s to %s", gap_start, gap_end)
                         
-                except Exception as e:
-                    logger.error(f"Error filling generation gap {gap_start} to {gap_end}: {e}")
-                    print(f"  Error filling generation gap {gap_start.strftime('%Y-%m-%d %H:%M')} to {gap_end.strftime('%Y-%m-%d %H:%M')}: {e}")
+                    except Exception as e:
+                        logger.error("Error filling generation gap %s to %s: %s", gap_start, gap_end, e)
+            
+            total_filled = max(self.db.insert_generation_data_bulk(rows), 0) if rows else 0
+            if total_filled:
+                self._seen_generation.update(normalize_timestamp(ts) for ts in filled_timestamps)
             
-            logger.info(f"Generation gap filling complete: {total_filled} points filled")
-            print(f"Generation gap filling complete: {total_filled} points filled")
+            logger.info("Generation gap filling complete: %s points filled", total_filled)
             return True
             
         except Exception as e:
-            logger.error(f"Error in generation gap filling: {e}")
+            logger.error("Error in generation gap filling: %s", e)
             return False
     
-    def _group_consecutive_gaps(self, gaps: List[Tuple[datetime, datetime]], granularity_minutes: int) -> List[Tuple[datetime, datetime]]:
+    def _group_consecutive_gaps(self, gaps: GapArray, granularity_minutes: int) -> List[Tuple[datetime, datetime]]:
         """Group consecutive gaps into ranges to minimize API calls, with 5-day limit"""
-        if not gaps:
+        if not gaps.starts:
             return []
         
-        # Sort gaps by start time
-        sorted_gaps = sorted(gaps, key=lambda x: x[0])
+        # Work on epoch seconds, sorted by start; datetimes are only built per range.
+        # The detector emits gaps in order, so the sort is normally skipped.
+        bounds = list(zip(gaps.starts, gaps.ends))
+        if any(later < earlier for earlier, later in zip(gaps.starts, gaps.starts[1:])):
+            bounds.sort()
+        step = granularity_minutes * 60
         
-        gap_ranges = []
-        current_start = sorted_gaps[0][0]
-        current_end = sorted_gaps[0][1]
+        # Detector output never has one gap starting right after another, so there
+        # is nothing to merge and each gap is already its own range
+        if all(later[0] != earlier[1] + step for earlier, later in zip(bounds, bounds[1:])):
+            return gap_array_to_tuples(GapArray(*zip(*bounds)))
+        max_duration = MAX_GAP_RANGE_SECONDS
         
-        for gap_start, gap_end in sorted_gaps[1:]:
-            # Check if this gap is consecutive with the current range
-            expected_next = current_end + timedelta(minutes=granularity_minutes)
-            
-            # Check if adding this gap would exceed 5 days
-            range_duration = gap_end - current_start
-            max_duration = timedelta(days=5)
-            
-            if gap_start == expected_next and range_duration <= max_duration:
+        ranges = []
+        range_start_s, current_end_s = bounds[0]
+        
+        for gap_start_s, gap_end_s in bounds[1:]:
+            if gap_start_s == current_end_s + step and gap_end_s - range_start_s <= max_duration:
                 # Consecutive gap within 5-day limit, extend the range
-                current_end = gap_end
+                current_end_s = gap_end_s
             else:
                 # Non-consecutive gap or would exceed 5 days, save current range and start new one
-                gap_ranges.append((current_start, current_end))
-                current_start = gap_start
-                current_end = gap_end
+                ranges.append((range_start_s, current_end_s))
+                range_start_s, current_end_s = gap_start_s, gap_end_s
         
         # Add the last range
-        gap_ranges.append((current_start, current_end))
+        ranges.append((range_start_s, current_end_s))
         
-        return gap_ranges
+        return [(from_epoch(start), from_epoch(end)) for start, end in ranges]
     
     def run_forecast_update(self) -> bool:
         """Check and update recent forecast records with actuals"""
         try:
             logger.info("Starting forecast update cycle...")
-            print("Starting forecast update cycle...")
             
             # Get recent forecast records (last 24 hours)
             forecast_records = self.db.get_recent_forecast_records(hours=24)
             
             if not forecast_records:
                 logger.info("No recent forecast records to update")
-                print("No recent forecast records to update")
                 return True
             
-            logger.info(f"Found {len(forecast_records)} recent forecast records to check")
-            print(f"Found {len(forecast_records)} recent forecast records to check")
+            logger.info("Found %s recent forecast records to check", len(forecast_records))
             
-            updated_count = 0
+            # Parse record times, skipping records more than a year old
+            current_time = datetime.now(timezone.utc)
+            record_times = {}
             for record in forecast_records:
                 try:
-                    # Parse timestamp
-                    timestamp_str = record['timestamp']
-                    if timestamp_str.endswith('Z'):
-                        record_time = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                    else:
-                        record_time = datetime.fromisoformat(timestamp_str)
-                    
-                    # Check if this record is more than a year old
-                    current_time = datetime.now(timezone.utc)
-                    if (current_time - record_time).days > 365:
-                        continue  # Skip old records
-                    
-                    # Fetch data for this specific timestamp
-                    start_time = record_time
-                    end_time = record_time + timedelta(minutes=30)  # 30-minute window
-                    
-                    data_points = self.carbon_intensity_api.get_intensity_data(start_time, end_time)
-                    
-                    if data_points:
-                        # Check if we got an actual value
-                        for point in data_points:
-                            if point['timestamp'] == timestamp_str and not point.get('is_forecast', True):
-                                # We got an actual value, update the record
-                                success = self.db.insert_carbon_intensity_data(
-                                    timestamp=point['timestamp'],
-                                    emissions=point['emissions'],
-                                    is_forecast=False
-                                )
-                                if success:
-                                    updated_count += 1
-                                    logger.info(f"Updated forecast to actual: {timestamp_str} = {point['emissions']}")
-                                    print(f"Updated forecast to actual: {timestamp_str} = {point['emissions']}")
-                                break
-                
-                except Exception as e:
-                    logger.error(f"Error updating forecast record {record['timestamp']}: {e}")
+                    record_time = parse_timestamp(record['timestamp'])
+                except ValueError as e:
+                    logger.error("Error updating forecast record %s: %s", record['timestamp'], e)
                     continue
+                if (current_time - record_time).days <= 365:
+                    record_times[record['timestamp']] = record_time
+            
+            if not record_times:
+                logger.info("No forecast records within the last year to update")
+                return True
+            
+            # Fetch one window covering every record, then index its actuals by instant
+            window_start = min(record_times.values())
+            window_end = max(record_times.values()) + timedelta(minutes=30)
+            data_points = self.carbon_intensity_api.get_intensity_data(window_start, window_end)
+            actuals = {
+                parse_timestamp(point['timestamp']): point
+                for point in data_points
+                if not point.get('is_forecast', True)
+            }
+            
+            # Actuals found for forecast records, written in one transaction
+            actual_rows = []
+            for timestamp_str, record_time in record_times.items():
+                point = actuals.get(record_time)
+                if point:
+                    actual_rows.append((point['timestamp'], point['emissions'], False))
+                    logger.debug("Found actual for forecast: %s = %s", timestamp_str, point['emissions'])
+            
+            # SQLite reports how many rows the upsert changed, so no per-row success checks
+            updated_count = self.db.insert_carbon_intensity_data_bulk(actual_rows) if actual_rows else 0
+            if updated_count < 0:
+                return False
             
-            logger.info(f"Forecast update complete: {updated_count} records updated")
-            print(f"Forecast update complete: {updated_count} records updated")
+            logger.info("Forecast update complete: %s records updated", updated_count)
             return True
             
         except Exception as e:
-            logger.error(f"Forecast update failed: {e}")
+            logger.error("Forecast update failed: %s", e)
             return False
     
     def run_backfill(self) -> bool:
         """Run backfill for all configured data sources"""
         try:
             logger.info("Starting backfill cycle...")
-            print("Starting backfill cycle...")
-            
-            # Set up API functions mapping
-            api_functions = {
-                'carbon_intensity_30min_data': self.carbon_intensity_api.get_intensity_data,
-                'generation_30min_data': self.elexon_bm_api.get_generation_data
-            }
-            
-            # Set up database insert functions mapping
-            db_insert_functions = {
-                'carbon_intensity_30min_data': self.db.insert_carbon_intensity_data,
-                'generation_30min_data': self.db.insert_generation_data
-            }
             
             # Run backfill cycle
             success = run_backfill_cycle(
                 backfill_configs=self.config.BACKFILL_CONFIG,
-                api_functions=api_functions,
-                db_insert_functions=db_insert_functions
+                api_functions=self._backfill_api_functions,
+                db_insert_functions=self._backfill_db_insert_functions,
+                max_workers=self.config.API_CONCURRENCY
             )
             
             if success:
-                print("Backfill cycle completed successfully")
+                logger.info("Backfill cycle completed successfully")
             else:
-                print("Backfill cycle failed")
+                logger.warning("Backfill cycle failed")
             
             return success
             
         except Exception as e:
-            logger.error(f"Backfill failed: {e}")
-            print(f"Backfill failed: {e}")
+            logger.error("Backfill failed: %s", e)
             return False
     
-    def main_loop(self):
-        """Main scheduling loop"""
-        logger.info("Starting Grid Tracker main loop...")
-        print("Grid Tracker starting up...")
-        
-        # Main loop
-        while self.running:
+    async def _run_periodic(self, name: str, task, interval: int, retry_on_failure: bool):
+        """Run a blocking task in a worker thread, then sleep until it is next due"""
+        # Failed collections are retried sooner than their normal interval
+        failure_delay = self.config.MAIN_LOOP_INTERVAL if retry_on_failure else interval
+        loop = asyncio.get_running_loop()
+        while not self._shutdown.is_set():
+            # Deadlines run on the loop's monotonic clock from when the run started,
+            # so a slow run does not push later runs back and wall-clock jumps are ignored
+            started = loop.time()
             try:
-                # Check and run scheduled tasks
-                if self.should_run_carbon_intensity_collection():
-                    success = self.collect_carbon_intensity_data()
-                    if success:
-                        self.last_carbon_intensity_collection = time.time()
-                        print(f"Carbon intensity collection completed at {datetime.now()}")
-                    else:
-                        print(f"Carbon intensity collection failed at {datetime.now()}")
-                
-                if self.should_run_elexon_bm_collection():
-                    success = self.collect_elexon_bm_data()
-                    if success:
-                        self.last_elexon_bm_reports_collection = time.time()
-                        print(f"Elexon BM collection completed at {datetime.now()}")
-                    else:
-                        print(f"Elexon BM collection failed at {datetime.now()}")
-                
-                if self.should_run_health_check():
-                    success = self.run_health_check()
-                    self.last_health_check = time.time()
-                    if success:
-                        print(f"Health check completed at {datetime.now()}")
-                    else:
-                        print(f"Health check failed at {datetime.now()}")
-                
-                if self.should_run_backfill():
-                    success = self.run_backfill()
-                    self.last_backfill = time.time()
-                    if success:
-                        print(f"Backfill completed at {datetime.now()}")
-                    else:
-                        print(f"Backfill failed at {datetime.now()}")
-                
-                if self.should_run_forecast_update():
-                    success = self.run_forecast_update()
-                    self.last_forecast_update = time.time()
-                    if success:
-                        print(f"Forecast update completed at {datetime.now()}")
-                    else:
-                        print(f"Forecast update failed at {datetime.now()}")
-                
-                # Sleep for a short interval
-                time.sleep(self.config.MAIN_LOOP_INTERVAL)
+                async with self._job_slots:
+                    # Jobs left waiting for a slot at shutdown exit instead of starting
+                    if self._shutdown.is_set():
+                        return
+                    success = await asyncio.to_thread(task)
+                logger.info("%s %s", name, "completed" if success else "failed")
+                deadline = started + (interval if success else failure_delay)
                 
             except Exception as e:
-                logger.error(f"Error in main loop: {e}")
-                print(f"Error in main loop: {e}")
-                time.sleep(60)  # Wait longer on error
+                logger.error("Error in %s: %s", name, e)
+                deadline = loop.time() + 60  # Wait longer on error
+            
+            # Sleep until the job is next due, waking early on shutdown
+            try:
+                await asyncio.wait_for(self._shutdown.wait(), timeout=max(0.0, deadline - loop.time()))
+                return
+            except asyncio.TimeoutError:
+                pass
+    
+    async def main_loop(self):
+        """Main scheduling loop"""
+        logger.info("Starting Grid Tracker main loop...")
+        
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self._signal_handler, signum)
+        
+        # A job already running finishes its current run before its task returns
+        async with asyncio.TaskGroup() as task_group:
+            for job in self._jobs:
+                task_group.create_task(self._run_periodic(*job))
         
         logger.info("Grid Tracker main loop stopped")
-        print("Grid Tracker shutting down...")
 
 def main():
     """Main entry point"""
@@ -741,15 +720,21 @@ def main():
     Path("/logs").mkdir(exist_ok=True)
 
     # Run deduplication/unique migration on startup
-    print("Running deduplication/unique migration...")
+    logger.info("Running deduplication/unique migration...")
     try:
         deduplicate_and_add_unique()
     except Exception as e:
-        print(f"[Migration] Failed to run migration: {e}")
+        logger.error("[Migration] Failed to run migration: %s", e)
 
     # Create and run tracker
     tracker = GridTracker()
-    tracker.main_loop()
+    if uvloop is not None:
+        # libuv-backed event loop, with cheaper timer and signal handling
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    try:
+        asyncio.run(tracker.main_loop())
+    finally:
+        tracker.http_session.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+In-memory TTL cache for API responses with stale-while-revalidate
+"""
+
+import logging
+import threading
+import time
+from functools import wraps
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Default lifetimes for API responses, in seconds
+RESPONSE_FRESH_SECONDS = 300
+RESPONSE_STALE_SECONDS = 1800
+
+# Most responses kept per cached function; the oldest is dropped beyond this
+RESPONSE_CACHE_MAX_ENTRIES = 128
+
+def ttl_cache(fresh: float, stale: float, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES) -> Callable:
+    """
+    Cache a function's results by its arguments
+
+    A result younger than `fresh` seconds is returned as is. One younger than
+    `stale` seconds is returned too, and a background thread refreshes it for
+    the next caller. Anything older is fetched again before returning. Empty
+    results are not cached, so failed or empty fetches are retried next call.
+    At most `max_entries` results are kept, dropping the oldest first.
+
+    Args:
+        fresh: Seconds a result is served without refreshing
+        stale: Seconds a result may be served while it is refreshed
+        max_entries: Most results kept at once
+
+    Returns:
+        Decorator for the function to cache
+    """
+    def decorator(func: Callable) -> Callable:
+        # key -> (fetched_at, value), using the monotonic clock, oldest first
+        entries = {}
+        refreshing = set()
+        lock = threading.Lock()
+
+        def fetch(key, args, kwargs):
+            value = func(*args, **kwargs)
+            if value:
+                now = time.monotonic()
+                with lock:
+                    # Drop entries too old to be served before adding this one
+                    for old_key in [k for k, (fetched_at, _) in entries.items() if now - fetched_at >= stale]:
+                        del entries[old_key]
+                    # Re-inserted so the dict stays ordered by fetch time
+                    entries.pop(key, None)
+                    while len(entries) >= max_entries:
+                        del entries[next(iter(entries))]
+                    entries[key] = (now, value)
+            return value
+
+        def refresh(key, args, kwargs):
+            try:
+                fetch(key, args, kwargs)
+            except Exception as e:
+                logger.warning(f"Background refresh of {func.__name__} failed: {e}")
+            finally:
+                with lock:
+                    refreshing.discard(key)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            with lock:
+                entry = entries.get(key)
+
+            if entry:
+                age = time.monotonic() - entry[0]
+                if age < fresh:
+                    return entry[1]
+                if age < stale:
+                    with lock:
+                        start_refresh = key not in refreshing
+                        refreshing.add(key)
+                    if start_refresh:
+                        threading.Thread(target=refresh, args=(key, args, kwargs), daemon=True).start()
+                    return entry[1]
+
+            return fetch(key, args, kwargs)
+
+        def cache_clear():
+            with lock:
+                entries.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
@@ -4,17 +4,46 @@ Backfill utilities for grid tracker
 """
 
 import logging
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone, timedelta
 from typing import Callable, Dict, List, Tuple, Optional
-from utils.database_utils import get_table_stats
+from utils.database_utils import get_table_stats, clear_table_stats_cache
 
 logger = logging.getLogger(__name__)
 
+# Seconds to wait before each retry of a backfill API call that timed out or could not connect
+RETRY_DELAYS = (0.3, 0.9, 2.7)
+
+# Backfill API calls made at once for one table
+DEFAULT_MAX_WORKERS = 4
+
+def fetch_with_retry(api_function: Callable, start_time: datetime, end_time: datetime) -> List[Dict]:
+    """
+    Call an API function, retrying transient network errors with exponential back-off
+    
+    Timeouts and connection errors are retried after each of RETRY_DELAYS. Any
+    other exception, or a transient one that outlasts the retries, is raised.
+    An empty result is returned as is, as the window simply has no data.
+    
+    Returns:
+        Data points from the first attempt that did not fail
+    """
+    for attempt, delay in enumerate(RETRY_DELAYS, start=1):
+        try:
+            return api_function(start_time, end_time)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            logger.warning(f"Backfill fetch for {start_time} to {end_time} failed: {e}; retry {attempt} in {delay}s")
+            time.sleep(delay)
+    return api_function(start_time, end_time)
+
 def backfill_table_data(
     table_name: str,
     api_function: Callable,
     config: Dict,
-    db_insert_function: Callable
+    db_insert_function: Callable,
+    max_workers: int = DEFAULT_MAX_WORKERS
 ) -> bool:
     """
     Backfill historical data for a specific table
@@ -23,23 +52,25 @@ def backfill_table_data(
         table_name: Name of the table to backfill
         api_function: Function to call for fetching data (takes start_time, end_time)
         config: Configuration dict with backfill parameters
-        db_insert_function: Function to insert data into database
+        db_insert_function: Function to store a batch of data points, returning rows written or -1 on error
+        max_workers: Maximum API calls in flight at once
         
     Returns:
-        True if backfill completed successfully, False otherwise
+        True if backfill made progress or had nothing to do, False if it failed
+        or the newest window failed so that no window could be stored
     """
     try:
         logger.info(f"Starting backfill for {table_name}")
+        current_time = datetime.now(timezone.utc)
         
         # Get current table stats
-        stats = get_table_stats(table_name)
+        stats = get_table_stats(table_name, include_count=False)
         if 'error' in stats:
             logger.error(f"Could not get stats for {table_name}: {stats['error']}")
             return False
         
         if not stats['has_data']:
             logger.info(f"Table {table_name} is empty, will backfill from current time")
-            current_time = datetime.now(timezone.utc)
             oldest_timestamp = current_time
         else:
             # Parse the oldest timestamp
@@ -54,7 +85,7 @@ def backfill_table_data(
                 return False
         
         # Calculate target oldest time
-        target_oldest_time = datetime.now(timezone.utc) - timedelta(days=config['target_oldest_days'])
+        target_oldest_time = current_time - timedelta(days=config['target_oldest_days'])
         
         # Check if we need to backfill
         if oldest_timestamp <= target_oldest_time:
@@ -72,67 +103,74 @@ def backfill_table_data(
         
         logger.info(f"Will make {calls_needed} API calls (max {max_calls} per cycle)")
         
-        # Make API calls to backfill data
-        total_inserted = 0
+        # Time range for each call, stopping at the oldest timestamp we already have
         current_start = oldest_timestamp - timedelta(hours=hours_per_call * calls_needed)
-        
+        windows = []
         for call_num in range(calls_needed):
-            try:
-                # Calculate time range for this call
-                call_start = current_start + timedelta(hours=hours_per_call * call_num)
-                call_end = call_start + timedelta(hours=hours_per_call)
-                
-                # Ensure we don't go beyond the oldest timestamp we already have
-                if call_end >= oldest_timestamp:
-                    call_end = oldest_timestamp
-                
-                logger.info(f"Backfill call {call_num + 1}/{calls_needed}: {call_start} to {call_end}")
-                
-                # Fetch data from API
-                data_points = api_function(call_start, call_end)
-                
-                if not data_points:
-                    logger.warning(f"No data received for backfill call {call_num + 1}")
-                    continue
+            call_start = current_start + timedelta(hours=hours_per_call * call_num)
+            call_end = min(call_start + timedelta(hours=hours_per_call), oldest_timestamp)
+            windows.append((call_start, call_end))
+        
+        # Fetch the windows concurrently, but store them newest first and only while
+        # every newer window has been stored. The next cycle starts from the oldest
+        # stored timestamp, so storing past a failed window would leave a hole
+        # that backfill never comes back to.
+        fetched = {}
+        next_call = len(windows) - 1
+        failed_call = None
+        total_inserted = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(fetch_with_retry, api_function, call_start, call_end): call_num
+                for call_num, (call_start, call_end) in enumerate(windows)
+            }
+            logger.info(f"Submitted {len(futures)} backfill calls for {table_name}")
+            
+            for future in as_completed(futures):
+                call_num = futures[future]
+                try:
+                    fetched[call_num] = future.result()
+                except Exception as e:
+                    call_start, call_end = windows[call_num]
+                    logger.error(f"Backfill call {call_num + 1} ({call_start} to {call_end}) failed: {e}")
+                    fetched[call_num] = None
                 
-                # Insert data into database
-                inserted_count = 0
-                for point in data_points:
-                    # Use table name to determine insertion method
-                    if table_name == 'carbon_intensity_30min_data':
-                        success = db_insert_function(
-                            timestamp=point['timestamp'],
-                            emissions=point['emissions'],
-                            is_forecast=point.get('is_forecast', False)
-                        )
-                    elif table_name == 'generation_30min_data':
-                        success = db_insert_function(
-                            timestamp=point['timestamp'],
-                            settlement_period=point['settlement_period'],
-                            biomass=point['biomass'],
-                            fossil_gas=point['fossil_gas'],
-                            fossil_hard_coal=point['fossil_hard_coal'],
-                            fossil_oil=point['fossil_oil'],
-                            hydro_pumped_storage=point['hydro_pumped_storage'],
-                            hydro_run_of_river=point['hydro_run_of_river'],
-                            nuclear=point['nuclear'],
-                            other=point['other'],
-                            solar=point['solar'],
-                            wind_offshore=point['wind_offshore'],
-                            wind_onshore=point['wind_onshore']
-                        )
-                    else:
-                        # Generic approach for unknown tables
-                        success = db_insert_function(**point)
+                # Store every window that is now contiguous with those already stored
+                while next_call >= 0 and next_call in fetched:
+                    data_points = fetched.pop(next_call)
+                    if data_points is None:
+                        failed_call = next_call
+                        break
                     
-                    if success:
-                        inserted_count += 1
-                
-                total_inserted += inserted_count
-                logger.info(f"Backfill call {call_num + 1}: inserted {inserted_count} points")
+                    if not data_points:
+                        logger.warning(f"No data received for backfill call {next_call + 1} ({windows[next_call][0]} to {windows[next_call][1]}), skipping window")
+                    else:
+                        # Insert the whole batch in one transaction
+                        inserted_count = db_insert_function(data_points)
+                        if inserted_count < 0:
+                            logger.error(f"Failed to store data for backfill call {next_call + 1}")
+                            failed_call = next_call
+                            break
+                        
+                        total_inserted += inserted_count
+                        if inserted_count:
+                            clear_table_stats_cache()
+                        logger.info(f"Backfill call {next_call + 1}: inserted {inserted_count} points")
+                    next_call -= 1
                 
-            except Exception as e:
-                logger.error(f"Backfill call {call_num + 1} failed: {e}")
+                if failed_call is not None:
+                    # Calls not yet started are dropped; ones in flight are waited for
+                    executor.shutdown(cancel_futures=True)
+                    break
+        
+        if failed_call is not None:
+            call_start, call_end = windows[failed_call]
+            logger.warning(
+                f"Backfill for {table_name} stopped at call {failed_call + 1} ({call_start} to {call_end}); "
+                f"it and {failed_call} older windows are left for the next cycle"
+            )
+            if failed_call == len(windows) - 1:
+                logger.error(f"Backfill for {table_name} failed: no calls succeeded")
                 return False
         
         logger.info(f"Backfill for {table_name} completed: {total_inserted} total points inserted")
@@ -145,7 +183,8 @@ def backfill_table_data(
 def run_backfill_cycle(
     backfill_configs: Dict,
     api_functions: Dict[str, Callable],
-    db_insert_functions: Dict[str, Callable]
+    db_insert_functions: Dict[str, Callable],
+    max_workers: int = DEFAULT_MAX_WORKERS
 ) -> bool:
     """
     Run a complete backfill cycle for all configured tables
@@ -153,7 +192,8 @@ def run_backfill_cycle(
     Args:
         backfill_configs: Configuration for each table
         api_functions: Mapping of table names to API functions
-        db_insert_functions: Mapping of table names to database insert functions
+        db_insert_functions: Mapping of table names to batch database insert functions
+        max_workers: Maximum API calls in flight at once for each table
         
     Returns:
         True if all backfills completed successfully, False if any failed
@@ -176,7 +216,8 @@ def run_backfill_cycle(
             table_name=table_name,
             api_function=api_functions[table_name],
             config=config,
-            db_insert_function=db_insert_functions[table_name]
+            db_insert_function=db_insert_functions[table_name],
+            max_workers=max_workers
         )
         
         if not table_success:
@@ -6,10 +6,56 @@ Database utility functions for the grid tracker
 import sqlite3
 import os
 import sys
+import time
+from functools import lru_cache
 from pathlib import Path
+from utils.timestamp_utils import normalize_timestamp
 
-def clear_table_data(table_name: str, db_path: str = '/data/grid.db'):
-    """Clear all data from a specific table"""
+# Table stats are reused for this many seconds, within one fixed time bucket
+STATS_TTL_SECONDS = 60
+
+# Connection settings for bulk scripts: WAL journal (persistent, as set by Database),
+# no fsync per commit, temp tables in memory, a 64 MiB page cache and 256 MiB of mmap
+BULK_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;
+    PRAGMA mmap_size=268435456;
+"""
+
+# SQL equivalent of normalize_timestamp(timestamp). Canonical 'YYYY-MM-DDTHH:MM[:SS]Z' values
+# are sliced in SQL; anything else goes to the function added by register_timestamp_functions
+NORMALIZED_TIMESTAMP_SQL = """
+    CASE WHEN substr(timestamp, -1) = 'Z' AND substr(timestamp, 14, 1) = ':'
+              AND (length(timestamp) = 17 OR (length(timestamp) = 20 AND substr(timestamp, 17, 1) = ':'))
+         THEN substr(timestamp, 1, 16) || 'Z'
+         ELSE normalize_timestamp(timestamp)
+    END
+"""
+
+def connect_db(db_path: str = '/data/grid.db') -> sqlite3.Connection:
+    """Open a connection tuned for scripts that read or rewrite many rows"""
+    conn = sqlite3.connect(db_path)
+    conn.executescript(BULK_PRAGMAS)
+    return conn
+
+def register_timestamp_functions(conn: sqlite3.Connection):
+    """Make normalize_timestamp callable from SQL on this connection, as NORMALIZED_TIMESTAMP_SQL needs"""
+    conn.create_function('normalize_timestamp', 1, normalize_timestamp, deterministic=True)
+
+def optimize_db(conn: sqlite3.Connection):
+    """Refresh the query planner's statistics after a migration changes many rows or indexes"""
+    conn.execute("PRAGMA analysis_limit=1000")
+    conn.execute("PRAGMA optimize")
+
+def clear_table_data(table_name: str, db_path: str = '/data/grid.db', confirm_skip: bool = False):
+    """
+    Clear all data from a specific table
+    
+    Asks the user to type 'DELETE <table_name>' first, unless confirm_skip is set
+    for scripted runs. Without a terminal or piped confirmation, the clear is cancelled.
+    """
     
     # Check if database exists
     if not os.path.exists(db_path):
@@ -46,11 +92,18 @@ def clear_table_data(table_name: str, db_path: str = '/data/grid.db'):
             print("This action cannot be undone!")
             
             # For safety, require explicit confirmation
-            confirm = input(f"\nType 'DELETE {table_name}' to confirm: ")
-            
-            if confirm != f'DELETE {table_name}':
-                print("❌ Deletion cancelled")
-                return False
+            if not confirm_skip:
+                expected = f'DELETE {table_name}'
+                try:
+                    confirm = input(f"\nType '{expected}' to confirm: ")
+                except EOFError:
+                    # No terminal and nothing piped in, e.g. under cron
+                    print("\n❌ No confirmation available; pass --yes to clear without prompting")
+                    return False
+                
+                if confirm != expected:
+                    print("❌ Deletion cancelled")
+                    return False
             
             # Delete all records
             cursor.execute(f"DELETE FROM {table_name}")
@@ -58,12 +111,12 @@ def clear_table_data(table_name: str, db_path: str = '/data/grid.db'):
             
             # Commit the changes
             conn.commit()
+            clear_table_stats_cache()
             
             print(f"✅ Successfully deleted {deleted_count} records from '{table_name}'")
             
-            # Verify table is empty
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            remaining_count = cursor.fetchone()[0]
+            # Verify table is empty; SQLite reports the deleted rows, so no second COUNT(*) scan
+            remaining_count = current_count - deleted_count
             
             if remaining_count == 0:
                 print(f"✅ Verification: Table '{table_name}' is now empty")
@@ -101,8 +154,27 @@ def list_available_tables(db_path: str = '/data/grid.db'):
     except Exception as e:
         print(f"❌ Error listing tables: {e}")
 
-def get_table_stats(table_name: str, db_path: str = '/data/grid.db'):
-    """Get statistics for a specific table"""
+def get_table_stats(table_name: str, db_path: str = '/data/grid.db', include_count: bool = True):
+    """
+    Get statistics for a specific table, reusing results for up to STATS_TTL_SECONDS
+    
+    COUNT(*) visits every row. Pass include_count=False when only has_data and the
+    timestamp range are needed; record_count is then None and the remaining
+    lookups are answered from the timestamp index.
+    """
+    return _cached_table_stats(table_name, db_path, include_count, int(time.time() // STATS_TTL_SECONDS))
+
+def clear_table_stats_cache():
+    """Forget cached table stats, e.g. after writing to a table"""
+    _cached_table_stats.cache_clear()
+
+@lru_cache(maxsize=32)
+def _cached_table_stats(table_name: str, db_path: str, include_count: bool, time_bucket: int):
+    """Cache key includes the time bucket, so entries expire when it moves on"""
+    return _query_table_stats(table_name, db_path, include_count)
+
+def _query_table_stats(table_name: str, db_path: str, include_count: bool):
+    """Query COUNT, MIN and MAX of timestamp for a table"""
     try:
         with sqlite3.connect(db_path) as conn:
             cursor = conn.cursor()
@@ -116,15 +188,22 @@ def get_table_stats(table_name: str, db_path: str = '/data/grid.db'):
             if not cursor.fetchone():
                 return {'error': f"Table '{table_name}' does not exist"}
             
-            # Get record count
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            count = cursor.fetchone()[0]
+            # Get record count, or just whether there is a first row
+            if include_count:
+                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+                count = cursor.fetchone()[0]
+                has_data = count > 0
+            else:
+                cursor.execute(f"SELECT 1 FROM {table_name} LIMIT 1")
+                count = None
+                has_data = cursor.fetchone() is not None
             
-            # Get date range if table has timestamp column
+            # Get date range if table has timestamp column. MIN and MAX are separate
+            # subqueries, as SQLite only answers a lone MIN or MAX from the index
             try:
                 cursor.execute(f"""
-                    SELECT MIN(timestamp), MAX(timestamp)
-                    FROM {table_name}
+                    SELECT (SELECT MIN(timestamp) FROM {table_name}),
+                           (SELECT MAX(timestamp) FROM {table_name})
                 """)
                 result = cursor.fetchone()
                 
@@ -134,20 +213,20 @@ def get_table_stats(table_name: str, db_path: str = '/data/grid.db'):
                         'record_count': count,
                         'earliest_timestamp': result[0],
                         'latest_timestamp': result[1],
-                        'has_data': count > 0
+                        'has_data': has_data
                     }
                 else:
                     return {
                         'table_name': table_name,
                         'record_count': count,
-                        'has_data': count > 0
+                        'has_data': has_data
                     }
             except sqlite3.OperationalError:
                 # Table doesn't have timestamp column
                 return {
                     'table_name': table_name,
                     'record_count': count,
-                    'has_data': count > 0
+                    'has_data': has_data
                 }
                 
     except Exception as e:
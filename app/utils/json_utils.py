@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+JSON decoding for API responses
+
+Uses orjson when it is installed and falls back to the standard library.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def loads(content: bytes):
+    """Decode a JSON document from raw response bytes"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
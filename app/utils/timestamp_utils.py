@@ -5,8 +5,16 @@ Timestamp utilities for handling format inconsistencies
 
 import re
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Union
 
+# Timestamps are half-hour aligned, so the same few strings are seen over and over
+TIMESTAMP_CACHE_SIZE = 8192
+
+# ISO 8601 timestamp with optional seconds and offset; group 1 is everything up to the minutes
+_TIMESTAMP_RE = re.compile(r'(\d{4}-\d\d-\d\dT\d\d:\d\d)(?::\d\d(?:\.\d+)?)?(?:Z|[+-]\d\d:?\d\d)?')
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
 def normalize_timestamp(timestamp_str: str) -> str:
     """
     Normalize timestamp string to consistent format without seconds.
@@ -20,6 +28,22 @@ def normalize_timestamp(timestamp_str: str) -> str:
     if not timestamp_str:
         return timestamp_str
     
+    # Canonical 'YYYY-MM-DDTHH:MM[:SS]Z' values are answered by length and one slice
+    if timestamp_str[-1] == 'Z' and timestamp_str[13:14] == ':':
+        length = len(timestamp_str)
+        if length == 17:
+            return timestamp_str
+        if length == 20 and timestamp_str[16] == ':':
+            return timestamp_str[:16] + 'Z'
+    
+    # Other well-formed timestamps are cut down to the minutes with one regex match
+    match = _TIMESTAMP_RE.fullmatch(timestamp_str)
+    if match:
+        return match.group(1) + 'Z'
+    return _slow_normalize_timestamp(timestamp_str)
+
+def _slow_normalize_timestamp(timestamp_str: str) -> str:
+    """Normalize a timestamp the regex does not recognise, e.g. with a space separator"""
     # Remove timezone info and convert to UTC Z format
     if '+' in timestamp_str:
         # Parse and convert to UTC Z format
@@ -32,8 +56,8 @@ def normalize_timestamp(timestamp_str: str) -> str:
         # Assume UTC if no timezone info
         timestamp_str = timestamp_str + 'Z'
     
-    # Remove seconds if present
-    if len(timestamp_str) > 17:  # Has seconds
+    # Remove seconds if present, i.e. a colon follows the minutes
+    if len(timestamp_str) >= 19 and timestamp_str[16] == ':':
         # Remove seconds and colon, keep Z
         normalized = timestamp_str[:16] + "Z"
     else:
@@ -41,15 +65,17 @@ def normalize_timestamp(timestamp_str: str) -> str:
     
     return normalized
 
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
 def parse_timestamp(timestamp_str: str) -> datetime:
     """
     Parse timestamp string to datetime object, handling various formats.
+    
+    Relies on Python 3.11+ fromisoformat accepting a trailing 'Z' directly,
+    which avoids building a '+00:00' copy of the string first. Results are
+    cached; datetimes are immutable, so sharing them between callers is safe.
     """
     try:
-        if timestamp_str.endswith('Z'):
-            return datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-        else:
-            return datetime.fromisoformat(timestamp_str)
+        return datetime.fromisoformat(timestamp_str)
     except Exception as e:
         raise ValueError(f"Could not parse timestamp '{timestamp_str}': {e}")
 
@@ -65,7 +91,7 @@ def timestamps_match(ts1: str, ts2: str) -> bool:
     """
     Compare two timestamp strings, normalizing both first.
     """
-    return normalize_timestamp(ts1) == normalize_timestamp(ts2)
+    return ts1 == ts2 or normalize_timestamp(ts1) == normalize_timestamp(ts2)
 
 def get_timestamp_format_info(timestamp_str: str) -> dict:
     """
@@ -74,7 +100,7 @@ def get_timestamp_format_info(timestamp_str: str) -> dict:
     info = {
         'original': timestamp_str,
         'normalized': normalize_timestamp(timestamp_str),
-        'has_seconds': len(timestamp_str) > 17,
+        'has_seconds': len(timestamp_str) >= 19 and timestamp_str[16] == ':',
         'has_timezone': '+' in timestamp_str or timestamp_str.endswith('Z'),
         'length': len(timestamp_str)
     }
@@ -91,6 +117,10 @@ def get_timestamp_format_info(timestamp_str: str) -> dict:
     
     return info 
 
+def _is_fixed_shape(ts: str) -> bool:
+    """True for 'YYYY-MM-DD?HH:MM...' strings, which the converters below slice directly"""
+    return len(ts) >= 16 and ts[10] in 'T ' and ts[13] == ':'
+
 def iso8601_to_sqlite_datetime(ts: str) -> str:
     """
     Convert ISO8601 timestamp (with 'T' and 'Z') to SQLite-compatible format ('YYYY-MM-DD HH:MM').
@@ -98,6 +128,8 @@ def iso8601_to_sqlite_datetime(ts: str) -> str:
     """
     if not ts:
         return ts
+    if _is_fixed_shape(ts):
+        return ts[:10] + ' ' + ts[11:16]
     # Remove 'Z' if present
     ts = ts.replace('Z', '')
     # Replace 'T' with space
@@ -107,26 +139,24 @@ def iso8601_to_sqlite_datetime(ts: str) -> str:
         ts = ts[:16]
     return ts 
 
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
 def iso8601_to_sql_datetime(ts: str) -> str:
     """
     Convert a 17- or 20-character ISO8601 timestamp (with 'T' and 'Z') to SQL datetime format (YYYY-MM-DD HH:MM:SS).
     Handles:
       - '2025-07-20T00:30Z' -> '2025-07-20 00:30:00'
       - '2025-07-20T00:30:00Z' -> '2025-07-20 00:30:00'
+    Results are cached, as refetched and backfilled windows convert the same timestamps again.
     """
     if not ts:
         return ts
+    if _is_fixed_shape(ts):
+        seconds = ts[16:19] if ts[16:17] == ':' else ':00'
+        return ts[:10] + ' ' + ts[11:16] + seconds
     ts = ts.replace('Z', '')
     ts = ts.replace('T', ' ')
-    if len(ts) == 16:  # 'YYYY-MM-DD HH:MM'
-        return ts + ':00'
-    elif len(ts) == 19:  # 'YYYY-MM-DD HH:MM:SS'
-        return ts
-    else:
-        # Try to parse with datetime for robustness
-        from datetime import datetime
-        try:
-            dt = datetime.fromisoformat(ts)
-            return dt.strftime('%Y-%m-%d %H:%M:%S')
-        except Exception:
-            return ts  # fallback, may be invalid 
\ No newline at end of file
+    try:
+        dt = datetime.fromisoformat(ts)
+        return dt.strftime('%Y-%m-%d %H:%M:%S')
+    except Exception:
+        return ts  # fallback, may be invalid
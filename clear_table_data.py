@@ -4,6 +4,7 @@ Generic script to clear all data from any table in the grid database
 Use this when you need to reset tables due to schema or data format changes
 """
 
+import argparse
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
@@ -11,6 +12,11 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
 from utils.database_utils import clear_table_data, list_available_tables
 
 def main():
+    parser = argparse.ArgumentParser(description="Clear all data from a table in the grid database")
+    parser.add_argument('table_name', nargs='?', help="Table to clear; prompted for if omitted")
+    parser.add_argument('-y', '--yes', action='store_true', help="Clear without asking for confirmation")
+    args = parser.parse_args()
+    
     print("Grid Database Table Clearer")
     print("=" * 30)
     print("This script will clear ALL data from any table in the grid database")
@@ -18,8 +24,8 @@ def main():
     print()
     
     # Check if table name was provided as argument
-    if len(sys.argv) > 1:
-        table_name = sys.argv[1]
+    if args.table_name:
+        table_name = args.table_name
         print(f"Target table: {table_name}")
     else:
         # Show available tables and ask user to choose
@@ -37,7 +43,7 @@ def main():
         print("❌ No table name provided")
         return
     
-    success = clear_table_data(table_name)
+    success = clear_table_data(table_name, confirm_skip=args.yes)
     
     if success:
         print(f"\n🎉 Table '{table_name}' cleared successfully!")
@@ -4,10 +4,52 @@ Migration script to add and backfill timestamp_sql columns in both tables.
 """
 import sqlite3
 from utils.timestamp_utils import iso8601_to_sql_datetime
+from utils.database_utils import connect_db, optimize_db
+
+# Rows still to backfill
+MISSING_WHERE = "(timestamp_sql IS NULL OR timestamp_sql = '')"
+
+def _timestamp_sql_expr(column: str) -> str:
+    """SQL equivalent of iso8601_to_sql_datetime for 'YYYY-MM-DD?HH:MM...' values in column"""
+    return (
+        f"substr({column}, 1, 10) || ' ' || substr({column}, 12, 5) || "
+        f"CASE WHEN substr({column}, 17, 1) = ':' THEN substr({column}, 17, 3) ELSE ':00' END"
+    )
+
+def _fixed_shape_where(column: str) -> str:
+    """Rows whose column value _timestamp_sql_expr can convert"""
+    return (
+        f"(length({column}) >= 16 AND substr({column}, 11, 1) IN ('T', ' ') "
+        f"AND substr({column}, 14, 1) = ':')"
+    )
+
+def _create_missing_index(cursor, table_name: str):
+    """Partial index over rows still to backfill, so the backfill queries skip the rows already done"""
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{table_name}_timestamp_sql_missing
+        ON {table_name}(timestamp) WHERE {MISSING_WHERE}
+    """)
+
+def _drop_missing_index(cursor, table_name: str):
+    """Drop the partial index; inserts leave timestamp_sql unset, so kept it would grow with the table"""
+    cursor.execute(f"DROP INDEX IF EXISTS idx_{table_name}_timestamp_sql_missing")
+
+def _backfill_timestamp_sql(cursor, table_name: str):
+    """Fill timestamp_sql in one UPDATE, converting any odd-shaped timestamps in Python"""
+    cursor.execute(f"""
+        UPDATE {table_name} SET timestamp_sql = {_timestamp_sql_expr('timestamp')}
+        WHERE {MISSING_WHERE} AND {_fixed_shape_where('timestamp')}
+    """)
+    cursor.execute(f"SELECT id, timestamp FROM {table_name} WHERE {MISSING_WHERE}")
+    rows = cursor.fetchall()
+    cursor.executemany(
+        f"UPDATE {table_name} SET timestamp_sql = ? WHERE id = ?",
+        [(iso8601_to_sql_datetime(ts), row_id) for row_id, ts in rows]
+    )
 
 def migrate_add_timestamp_sql_column():
     db_path = '/data/grid.db'
-    with sqlite3.connect(db_path) as conn:
+    with connect_db(db_path) as conn:
         cursor = conn.cursor()
         # Add column to generation_30min_data
         try:
@@ -19,39 +61,38 @@ def migrate_add_timestamp_sql_column():
             cursor.execute("ALTER TABLE carbon_intensity_30min_data ADD COLUMN timestamp_sql DATETIME")
         except sqlite3.OperationalError:
             pass  # already exists
+        _create_missing_index(cursor, 'generation_30min_data')
+        _create_missing_index(cursor, 'carbon_intensity_30min_data')
         # Print count of NULL/empty timestamp_sql before backfill
-        cursor.execute("SELECT COUNT(*) FROM generation_30min_data WHERE timestamp_sql IS NULL OR timestamp_sql = ''")
+        cursor.execute(f"SELECT COUNT(*) FROM generation_30min_data WHERE {MISSING_WHERE}")
         null_before = cursor.fetchone()[0]
         print(f'[Migration] Rows with NULL or empty timestamp_sql before backfill: {null_before}', flush=True)
-        # Print only conflicts, with full details of the conflicting row and the original timestamp
-        cursor.execute("SELECT id, timestamp FROM generation_30min_data WHERE timestamp_sql IS NULL OR timestamp_sql = ''")
-        rows = cursor.fetchall()
-        for row in rows:
-            row_id, ts = row
-            ts_sql = iso8601_to_sql_datetime(ts)
-            cursor.execute("SELECT id, timestamp, timestamp_sql FROM generation_30min_data WHERE timestamp_sql = ? AND id != ?", (ts_sql, row_id))
-            conflict = cursor.fetchone()
-            if conflict:
-                print(f'[Migration] CONFLICT: Row id={row_id} (timestamp={ts}) would set timestamp_sql={ts_sql}, but it already exists in row id={conflict[0]}', flush=True)
-                print(f'[Migration] Conflicting row details: id={conflict[0]}, timestamp={conflict[1]}, timestamp_sql={conflict[2]}', flush=True)
+        # Print only conflicts, with full details of the conflicting row and the original timestamp.
+        # One self-join finds them all, using the indexed timestamp_sql of the existing rows
+        cursor.execute(f"""
+            SELECT a.id, a.timestamp, {_timestamp_sql_expr('a.timestamp')}, MIN(b.id), b.timestamp, b.timestamp_sql
+            FROM generation_30min_data a
+            JOIN generation_30min_data b
+              ON b.timestamp_sql = {_timestamp_sql_expr('a.timestamp')} AND b.id != a.id
+            WHERE (a.timestamp_sql IS NULL OR a.timestamp_sql = '') AND {_fixed_shape_where('a.timestamp')}
+            GROUP BY a.id
+        """)
+        for row_id, ts, ts_sql, conflict_id, conflict_ts, conflict_ts_sql in cursor.fetchall():
+            print(f'[Migration] CONFLICT: Row id={row_id} (timestamp={ts}) would set timestamp_sql={ts_sql}, but it already exists in row id={conflict_id}', flush=True)
+            print(f'[Migration] Conflicting row details: id={conflict_id}, timestamp={conflict_ts}, timestamp_sql={conflict_ts_sql}', flush=True)
         # Proceed with backfill as before
-        for row in rows:
-            row_id, ts = row
-            ts_sql = iso8601_to_sql_datetime(ts)
-            cursor.execute("UPDATE generation_30min_data SET timestamp_sql = ? WHERE id = ?", (ts_sql, row_id))
+        _backfill_timestamp_sql(cursor, 'generation_30min_data')
         # Print count of NULL/empty timestamp_sql after backfill
-        cursor.execute("SELECT COUNT(*) FROM generation_30min_data WHERE timestamp_sql IS NULL OR timestamp_sql = ''")
+        cursor.execute(f"SELECT COUNT(*) FROM generation_30min_data WHERE {MISSING_WHERE}")
         null_after = cursor.fetchone()[0]
         print(f'[Migration] Rows with NULL or empty timestamp_sql after backfill: {null_after}', flush=True)
         # Backfill carbon_intensity_30min_data
-        cursor.execute("SELECT id, timestamp FROM carbon_intensity_30min_data WHERE timestamp_sql IS NULL OR timestamp_sql = ''")
-        rows = cursor.fetchall()
-        for row in rows:
-            row_id, ts = row
-            ts_sql = iso8601_to_sql_datetime(ts)
-            cursor.execute("UPDATE carbon_intensity_30min_data SET timestamp_sql = ? WHERE id = ?", (ts_sql, row_id))
+        _backfill_timestamp_sql(cursor, 'carbon_intensity_30min_data')
+        _drop_missing_index(cursor, 'generation_30min_data')
+        _drop_missing_index(cursor, 'carbon_intensity_30min_data')
+        optimize_db(conn)
         conn.commit()
         print('[Migration] timestamp_sql column migration complete.', flush=True)
 
 if __name__ == '__main__':
-    migrate_add_timestamp_sql_column()
\ No newline at end of file
+    migrate_add_timestamp_sql_column()
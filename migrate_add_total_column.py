@@ -1,5 +1,8 @@
+import argparse
 import sqlite3
 
+from utils.database_utils import connect_db, optimize_db
+
 DB_PATH = '/data/grid.db'
 
 SOURCE_COLUMNS = [
@@ -8,8 +11,8 @@ SOURCE_COLUMNS = [
     'other', 'solar', 'wind_offshore', 'wind_onshore'
 ]
 
-def migrate_add_total_column():
-    conn = sqlite3.connect(DB_PATH)
+def migrate_add_total_column(verify: bool = False):
+    conn = connect_db(DB_PATH)
     cursor = conn.cursor()
 
     print('--- Adding total column to generation_30min_data ---', flush=True)
@@ -25,21 +28,28 @@ def migrate_add_total_column():
             conn.close()
             return
 
-    # 2. Backfill the total column for all rows
+    # 2. Backfill the total column for rows that don't have one yet. The app writes
+    # total with every row, so after the first run only rows inserted without it
+    # (e.g. interpolated ones) are rewritten rather than every page of the table
     sum_expr = ' + '.join([f'COALESCE({col}, 0)' for col in SOURCE_COLUMNS])
-    update_sql = f"UPDATE generation_30min_data SET total = {sum_expr}"
+    update_sql = f"UPDATE generation_30min_data SET total = {sum_expr} WHERE total IS NULL"
     print(f'Backfilling total column with: {update_sql}', flush=True)
     cursor.execute(update_sql)
-    print('Backfill complete.', flush=True)
+    print(f'Backfill complete: {cursor.rowcount} rows updated.', flush=True)
 
-    # 3. Print a summary
-    cursor.execute('SELECT COUNT(*), SUM(total) FROM generation_30min_data')
-    count, total_sum = cursor.fetchone()
-    print(f'Total rows: {count}, Sum of total: {total_sum}', flush=True)
+    # 3. Print a summary on request, as it reads every row of the table
+    if verify:
+        cursor.execute('SELECT COUNT(*), SUM(total) FROM generation_30min_data')
+        count, total_sum = cursor.fetchone()
+        print(f'Total rows: {count}, Sum of total: {total_sum}', flush=True)
 
+    optimize_db(conn)
     conn.commit()
     conn.close()
     print('--- Migration complete ---', flush=True)
 
 if __name__ == '__main__':
-    migrate_add_total_column() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Add and backfill the total column in generation_30min_data')
+    parser.add_argument('--verify', action='store_true', help='print the row count and sum of total afterwards')
+    args = parser.parse_args()
+    migrate_add_total_column(verify=args.verify) 
\ No newline at end of file
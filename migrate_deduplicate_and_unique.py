@@ -1,51 +1,22 @@
-import sqlite3
-from utils.timestamp_utils import normalize_timestamp
+from utils.database_utils import NORMALIZED_TIMESTAMP_SQL, connect_db, optimize_db, register_timestamp_functions
 
 DB_PATH = '/data/grid.db' # Changed from './volumes/database/grid.db'
 
-def deduplicate_and_add_unique():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+# Unique indexes this migration adds to generation_30min_data
+UNIQUE_INDEXES = ('idx_generation_timestamp_unique', 'idx_generation_timestamp_sql_unique')
 
-    print('--- Deduplicating generation_30min_data ---', flush=True)
-    # 1. Find all timestamps and their normalized versions
-    cursor.execute('SELECT id, timestamp, created_at FROM generation_30min_data')
-    rows = cursor.fetchall()
-    norm_map = {}
-    for row_id, ts, created_at in rows:
-        norm_ts = normalize_timestamp(ts)
-        if norm_ts not in norm_map:
-            norm_map[norm_ts] = []
-        norm_map[norm_ts].append((row_id, ts, created_at))
-    # 2. For each group with >1 row, keep the most recent, delete the rest
-    deleted = 0
-    for norm_ts, group in norm_map.items():
-        if len(group) > 1:
-            # Sort by created_at (or id if created_at is None)
-            group_sorted = sorted(group, key=lambda x: (x[2] or '', x[0]))
-            to_keep = group_sorted[-1][0]
-            to_delete = [r[0] for r in group_sorted[:-1]]
-            cursor.execute(f"DELETE FROM generation_30min_data WHERE id IN ({','.join(['?']*len(to_delete))})", to_delete)
-            deleted += len(to_delete)
-            print(f'[Normalization] For normalized timestamp {norm_ts}, kept id={to_keep}, deleted ids={to_delete}', flush=True)
-    print(f'[Normalization] Deleted {deleted} rows due to timestamp normalization conflicts.', flush=True)
-    # 3. Now normalize all timestamps
-    cursor.execute('SELECT id, timestamp FROM generation_30min_data')
-    rows = cursor.fetchall()
-    updated = 0
-    for row_id, ts in rows:
-        norm_ts = normalize_timestamp(ts)
-        if ts != norm_ts:
-            cursor.execute('UPDATE generation_30min_data SET timestamp = ? WHERE id = ?', (norm_ts, row_id))
-            updated += 1
-    print(f'Normalized {updated} timestamp(s) to consistent format.', flush=True)
-
-    # Print initial row count
-    cursor.execute('SELECT COUNT(*) FROM generation_30min_data')
-    initial_count = cursor.fetchone()[0]
-    print(f'Initial row count: {initial_count}', flush=True)
+def _unique_indexes_exist(cursor) -> bool:
+    """True once both unique indexes are in place, so no exact duplicates can exist"""
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name IN (?, ?)",
+        UNIQUE_INDEXES
+    )
+    return cursor.fetchone()[0] == len(UNIQUE_INDEXES)
 
-    # 4. Remove duplicates for timestamp (should be none now)
+def _remove_exact_duplicates(conn):
+    """Report and delete rows sharing a timestamp or timestamp_sql, keeping the lowest rowid"""
+    cursor = conn.cursor()
+    # Report duplicates for timestamp (should be none after normalization)
     cursor.execute('''
         SELECT timestamp, COUNT(*) FROM generation_30min_data GROUP BY timestamp HAVING COUNT(*) > 1
     ''')
@@ -57,17 +28,7 @@ def deduplicate_and_add_unique():
             ids = [r[0] for r in cursor.fetchall()]
             print(f'[Deduplication] Duplicate timestamp: {ts} (count={count}), row ids={ids}', flush=True)
         print(f'Example duplicate timestamp: {timestamp_dupes[0]}', flush=True)
-    cursor.execute('''
-        DELETE FROM generation_30min_data
-        WHERE rowid NOT IN (
-            SELECT MIN(rowid)
-            FROM generation_30min_data
-            GROUP BY timestamp
-        )
-    ''')
-    print('Deduplicated on timestamp.', flush=True)
-
-    # 5. Remove duplicates for timestamp_sql
+    # Report duplicates for timestamp_sql
     cursor.execute('''
         SELECT timestamp_sql, COUNT(*) FROM generation_30min_data GROUP BY timestamp_sql HAVING COUNT(*) > 1 AND timestamp_sql IS NOT NULL
     ''')
@@ -75,40 +36,109 @@ def deduplicate_and_add_unique():
     print(f'Found {len(timestamp_sql_dupes)} duplicate timestamp_sql(s).', flush=True)
     if timestamp_sql_dupes:
         print(f'Example duplicate timestamp_sql: {timestamp_sql_dupes[0]}', flush=True)
+    # Remove duplicates for timestamp, then for timestamp_sql among the rows that
+    # survive the first pass, keeping the lowest rowid each time
+    changes_before = conn.total_changes
     cursor.execute('''
-        DELETE FROM generation_30min_data
-        WHERE rowid NOT IN (
-            SELECT MIN(rowid)
+        WITH by_timestamp AS (
+            SELECT rowid,
+                   timestamp_sql,
+                   ROW_NUMBER() OVER (PARTITION BY timestamp ORDER BY rowid) AS ts_rank
             FROM generation_30min_data
-            GROUP BY timestamp_sql
+        ),
+        by_timestamp_sql AS (
+            SELECT rowid,
+                   ROW_NUMBER() OVER (PARTITION BY timestamp_sql ORDER BY rowid) AS ts_sql_rank
+            FROM by_timestamp
+            WHERE ts_rank = 1 AND timestamp_sql IS NOT NULL
         )
+        DELETE FROM generation_30min_data
+        WHERE rowid IN (
+            SELECT rowid FROM by_timestamp WHERE ts_rank > 1
+            UNION ALL
+            SELECT rowid FROM by_timestamp_sql WHERE ts_sql_rank > 1
+        )
+    ''')
+    print(f'Deduplicated on timestamp and timestamp_sql ({conn.total_changes - changes_before} rows removed).', flush=True)
+
+def deduplicate_and_add_unique():
+    conn = connect_db(DB_PATH)
+    cursor = conn.cursor()
+
+    print('--- Deduplicating generation_30min_data ---', flush=True)
+    # 1. Find rows whose timestamps collide once normalized. Grouping happens in SQL,
+    # so only the colliding rows are read, each group ordered with the most recent last
+    register_timestamp_functions(conn)
+    cursor.execute(f'''
+        SELECT id, norm_ts FROM (
+            SELECT id, norm_ts,
+                   ROW_NUMBER() OVER (PARTITION BY norm_ts ORDER BY COALESCE(created_at, '') DESC, id DESC) AS recency,
+                   COUNT(*) OVER (PARTITION BY norm_ts) AS group_size
+            FROM (SELECT id, created_at, {NORMALIZED_TIMESTAMP_SQL} AS norm_ts FROM generation_30min_data)
+        )
+        WHERE group_size > 1
+        ORDER BY norm_ts, recency DESC
     ''')
-    print('Deduplicated on timestamp_sql.', flush=True)
+    norm_map = {}
+    for row_id, norm_ts in cursor:
+        norm_map.setdefault(norm_ts, []).append(row_id)
+    # 2. For each group, keep the most recent (by created_at, then id), delete the rest
+    delete_ids = []
+    for norm_ts, group in norm_map.items():
+        to_keep = group[-1]
+        to_delete = group[:-1]
+        delete_ids.extend(to_delete)
+        print(f'[Normalization] For normalized timestamp {norm_ts}, kept id={to_keep}, deleted ids={to_delete}', flush=True)
+    # One prepared DELETE for every group rather than a statement built per group
+    cursor.executemany('DELETE FROM generation_30min_data WHERE id = ?', [(row_id,) for row_id in delete_ids])
+    print(f'[Normalization] Deleted {len(delete_ids)} rows due to timestamp normalization conflicts.', flush=True)
+    # 3. Now normalize all timestamps in one UPDATE. NORMALIZED_TIMESTAMP_SQL slices
+    # canonical values in SQL, so Python is only called for unusual formats
+    cursor.execute(f'''
+        UPDATE generation_30min_data
+        SET timestamp = {NORMALIZED_TIMESTAMP_SQL}
+        WHERE timestamp != {NORMALIZED_TIMESTAMP_SQL}
+    ''')
+    print(f'Normalized {cursor.rowcount} timestamp(s) to consistent format.', flush=True)
+
+    # Print initial row count
+    cursor.execute('SELECT COUNT(*) FROM generation_30min_data')
+    initial_count = cursor.fetchone()[0]
+    print(f'Initial row count: {initial_count}', flush=True)
+
+    # 4. Remove exact duplicates. Once both unique indexes exist there can be none,
+    # so re-runs skip the grouping scans over the whole table
+    if _unique_indexes_exist(cursor):
+        print('Unique indexes already exist; skipping exact duplicate removal.', flush=True)
+    else:
+        _remove_exact_duplicates(conn)
 
     # Print row count after deduplication
     cursor.execute('SELECT COUNT(*) FROM generation_30min_data')
     after_dedupe_count = cursor.fetchone()[0]
     print(f'Row count after deduplication: {after_dedupe_count}', flush=True)
 
-    # 6. Add unique index on timestamp (if not exists)
+    # 5. Add unique index on timestamp (if not exists)
     try:
         cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_generation_timestamp_unique ON generation_30min_data(timestamp)')
         print('Unique index added on timestamp.', flush=True)
     except Exception as e:
         print(f'Could not add unique index on timestamp: {e}', flush=True)
 
-    # 7. Add unique index on timestamp_sql (if not exists)
+    # 6. Add unique index on timestamp_sql (if not exists)
     try:
         cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_generation_timestamp_sql_unique ON generation_30min_data(timestamp_sql)')
         print('Unique index added on timestamp_sql.', flush=True)
     except Exception as e:
         print(f'Could not add unique index on timestamp_sql: {e}', flush=True)
 
-    # 8. Print summary
+    # 7. Print summary
     cursor.execute('SELECT COUNT(*) FROM generation_30min_data')
     total = cursor.fetchone()[0]
     print(f'Total rows after deduplication: {total}', flush=True)
 
+    # Refresh planner statistics now the unique indexes exist
+    optimize_db(conn)
     conn.commit()
     conn.close()
     print('--- Migration complete ---', flush=True)
@@ -6,23 +6,27 @@ Script to normalize all timestamps in the database to consistent format
 import sys
 import os
 
-import sqlite3
 import logging
 from datetime import datetime
 
 # Add the current directory to the path so we can import from utils
 sys.path.insert(0, os.path.dirname(__file__))
 from utils.timestamp_utils import normalize_timestamp
+from utils.database_utils import NORMALIZED_TIMESTAMP_SQL, connect_db, register_timestamp_functions
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Timestamp mappings rewritten per UPDATE; each takes three parameters, which keeps
+# a batch within SQLite's historical limit of 999 bound parameters
+NORMALIZE_BATCH_SIZE = 300
+
 def normalize_database_timestamps():
     """Normalize all timestamps in the database to consistent format"""
     db_path = '/data/grid.db'
     
-    with sqlite3.connect(db_path) as conn:
+    with connect_db(db_path) as conn:
         cursor = conn.cursor()
         
         # First, let's see what we're working with
@@ -65,32 +69,31 @@ def normalize_database_timestamps():
         # First, handle duplicate timestamps
         logger.info("=== Handling Duplicate Timestamps ===")
         
-        # Find timestamps that would conflict after normalization
-        # Get all timestamps and their normalized versions
-        cursor.execute("""
-            SELECT timestamp
-            FROM generation_30min_data
-            ORDER BY timestamp
+        # Find timestamps that would conflict after normalization. Grouping by the
+        # normalized timestamp happens in SQL, so only the colliding timestamps are read
+        register_timestamp_functions(conn)
+        cursor.execute(f"""
+            SELECT norm_ts, timestamp FROM (
+                SELECT timestamp, norm_ts, COUNT(*) OVER (PARTITION BY norm_ts) AS group_size
+                FROM (SELECT timestamp, {NORMALIZED_TIMESTAMP_SQL} AS norm_ts FROM generation_30min_data)
+            )
+            WHERE group_size > 1
+            ORDER BY norm_ts, timestamp
         """)
         
-        all_timestamps = cursor.fetchall()
-        
         # Group by normalized timestamp
         normalized_groups = {}
-        for (ts,) in all_timestamps:
-            normalized_ts = normalize_timestamp(ts)
-            if normalized_ts not in normalized_groups:
-                normalized_groups[normalized_ts] = []
-            normalized_groups[normalized_ts].append(ts)
-        
-        # Find duplicates
-        duplicates = []
-        for normalized_ts, original_timestamps in normalized_groups.items():
-            if len(original_timestamps) > 1:
-                duplicates.append((normalized_ts, len(original_timestamps), original_timestamps))
+        for normalized_ts, ts in cursor:
+            normalized_groups.setdefault(normalized_ts, []).append(ts)
+        
+        duplicates = [
+            (normalized_ts, len(original_timestamps), original_timestamps)
+            for normalized_ts, original_timestamps in normalized_groups.items()
+        ]
         
         logger.info(f"Found {len(duplicates)} normalized timestamps with duplicates")
         
+        all_delete_ids = []
         for normalized_ts, count, original_timestamps in duplicates:
             logger.info(f"  {normalized_ts}: {count} records from {original_timestamps}")
             
@@ -113,15 +116,14 @@ def normalize_database_timestamps():
                 delete_ids = [r[0] for r in records[:-1]]  # All other record IDs
                 
                 logger.info(f"    Keeping record {keep_id}, deleting {len(delete_ids)} duplicates")
-                
-                # Delete duplicate records
-                placeholders = ','.join(['?' for _ in delete_ids])
-                cursor.execute(f"""
-                    DELETE FROM generation_30min_data
-                    WHERE id IN ({placeholders})
-                """, delete_ids)
-                
-                logger.info(f"    Deleted {len(delete_ids)} duplicate records")
+                all_delete_ids.extend(delete_ids)
+        
+        # Delete duplicate records from every group with one prepared statement
+        cursor.executemany(
+            "DELETE FROM generation_30min_data WHERE id = ?",
+            [(record_id,) for record_id in all_delete_ids]
+        )
+        logger.info(f"Deleted {len(all_delete_ids)} duplicate records")
         
         # Commit the duplicate removal
         conn.commit()
@@ -160,18 +162,20 @@ def normalize_database_timestamps():
         
         logger.info(f"Will update {len(timestamp_mapping)} unique timestamps")
         
-        # Update the timestamps
+        # Update the timestamps, rewriting a batch of mappings with each CASE statement
         updated_count = 0
-        for old_ts, new_ts in timestamp_mapping.items():
-            cursor.execute("""
+        mappings = list(timestamp_mapping.items())
+        for i in range(0, len(mappings), NORMALIZE_BATCH_SIZE):
+            batch = mappings[i:i + NORMALIZE_BATCH_SIZE]
+            cursor.execute(f"""
                 UPDATE generation_30min_data
-                SET timestamp = ?
-                WHERE timestamp = ?
-            """, (new_ts, old_ts))
+                SET timestamp = CASE timestamp {' '.join(['WHEN ? THEN ?'] * len(batch))} ELSE timestamp END
+                WHERE timestamp IN ({','.join(['?'] * len(batch))})
+            """, [ts for pair in batch for ts in pair] + [old_ts for old_ts, _ in batch])
             
             rows_affected = cursor.rowcount
             updated_count += rows_affected
-            logger.info(f"Updated {rows_affected} rows: {old_ts} -> {new_ts}")
+            logger.info(f"Updated {rows_affected} rows for {len(batch)} timestamps")
         
         # Commit the changes
         conn.commit()
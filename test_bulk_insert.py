@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Test script for the bulk insert methods on a temporary database
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from database import Database, GENERATION_INSERT_COLUMNS
+import sqlite3
+import tempfile
+
+def check(name, condition):
+    """Print and return the result of one check"""
+    print(f"{'✅ SUCCESS' if condition else '❌ FAILURE'}: {name}")
+    return condition
+
+def fetch_carbon_rows(db_path):
+    """Stored carbon intensity rows as {timestamp: (emissions, is_forecast)}"""
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT timestamp, emissions, is_forecast FROM carbon_intensity_30min_data").fetchall()
+    return {timestamp: (emissions, is_forecast) for timestamp, emissions, is_forecast in rows}
+
+def test_carbon_intensity_bulk_insert():
+    """Test that bulk carbon intensity writes keep actuals and count only changed rows"""
+    print("Testing Carbon Intensity Bulk Insert")
+    print("=" * 50)
+
+    overall_pass = True
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'grid.db')
+        db = Database(db_path=db_path)
+
+        print("\n1. Inserting Forecasts:")
+        changed = db.insert_carbon_intensity_data_bulk([
+            ('2024-01-01T00:30Z', 100, True),
+            ('2024-01-01T01:00Z', 110, True),
+        ])
+        overall_pass &= check(f"2 new forecasts counted (returned {changed})", changed == 2)
+
+        print("\n2. Replacing a Forecast with an Actual:")
+        # Same slot in another format, so it must normalize onto the stored row
+        changed = db.insert_carbon_intensity_data_bulk([('2024-01-01T00:30:00Z', 95, False)])
+        rows = fetch_carbon_rows(db_path)
+        overall_pass &= check(f"1 row changed (returned {changed})", changed == 1)
+        overall_pass &= check(f"Actual replaced the forecast: {rows}", rows.get('2024-01-01T00:30Z') == (95, 0) and len(rows) == 2)
+
+        print("\n3. Forecast Must Not Overwrite an Actual:")
+        changed = db.insert_carbon_intensity_data_bulk([('2024-01-01T00:30Z', 120, True)])
+        rows = fetch_carbon_rows(db_path)
+        overall_pass &= check(f"No rows changed (returned {changed})", changed == 0)
+        overall_pass &= check("Actual kept", rows.get('2024-01-01T00:30Z') == (95, 0))
+
+        print("\n4. Mixed Batch:")
+        # Skipped forecast, forecast updated by a forecast, actual updated by an actual, new row
+        changed = db.insert_carbon_intensity_data_bulk([
+            ('2024-01-01T00:30Z', 130, True),
+            ('2024-01-01T01:00Z', 115, True),
+            ('2024-01-01T00:30Z', 96, False),
+            ('2024-01-01T01:30Z', 105, False),
+        ])
+        rows = fetch_carbon_rows(db_path)
+        overall_pass &= check(f"3 rows changed (returned {changed})", changed == 3)
+        overall_pass &= check(f"Stored rows: {rows}", rows == {
+            '2024-01-01T00:30Z': (96, 0),
+            '2024-01-01T01:00Z': (115, 1),
+            '2024-01-01T01:30Z': (105, 0),
+        })
+
+        print("\n5. Failed Write:")
+        # emissions is NOT NULL, so the whole batch is rolled back
+        changed = db.insert_carbon_intensity_data_bulk([
+            ('2024-01-01T02:00Z', 100, False),
+            ('2024-01-01T02:30Z', None, False),
+        ])
+        rows = fetch_carbon_rows(db_path)
+        overall_pass &= check(f"Returned -1 (returned {changed})", changed == -1)
+        overall_pass &= check("Nothing from the failed batch stored", '2024-01-01T02:00Z' not in rows)
+
+    print("\n==============================")
+    if overall_pass:
+        print("🎉 CARBON INTENSITY BULK INSERT TEST PASSED!")
+    else:
+        print("❌ CARBON INTENSITY BULK INSERT TEST FAILED")
+
+    return overall_pass
+
+def create_generation_database(db_path):
+    """Create the tables, plus the generation columns added by the migrations"""
+    db = Database(db_path=db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("ALTER TABLE generation_30min_data ADD COLUMN timestamp_sql DATETIME")
+        conn.execute("ALTER TABLE generation_30min_data ADD COLUMN total REAL")
+        conn.commit()
+    return db
+
+def generation_row(timestamp, timestamp_sql, nuclear, total):
+    """Row in GENERATION_INSERT_COLUMNS order with only nuclear reported"""
+    values = dict.fromkeys(GENERATION_INSERT_COLUMNS)
+    values.update(timestamp=timestamp, timestamp_sql=timestamp_sql, settlement_period=1, nuclear=nuclear, total=total)
+    return tuple(values[column] for column in GENERATION_INSERT_COLUMNS)
+
+def fetch_generation_rows(db_path):
+    """Stored generation rows as {timestamp: (nuclear, total)}"""
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT timestamp, nuclear, total FROM generation_30min_data").fetchall()
+    return {timestamp: (nuclear, total) for timestamp, nuclear, total in rows}
+
+def test_generation_bulk_insert():
+    """Test that bulk generation writes replace rows, round to whole MW and count changes"""
+    print("\nTesting Generation Bulk Insert")
+    print("=" * 50)
+
+    overall_pass = True
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'grid.db')
+        db = create_generation_database(db_path)
+
+        print("\n1. Inserting Rows:")
+        changed = db.insert_generation_data_bulk([
+            generation_row('2024-01-01T00:00:00Z', '2024-01-01 00:00:00', 4000.4, 4000.4),
+            generation_row('2024-01-01T00:30:00Z', '2024-01-01 00:30:00', 4100.6, 4100.6),
+        ])
+        rows = fetch_generation_rows(db_path)
+        overall_pass &= check(f"2 new rows counted (returned {changed})", changed == 2)
+        overall_pass &= check(f"Quantities rounded to whole MW: {rows}", rows == {
+            '2024-01-01T00:00:00Z': (4000, 4000),
+            '2024-01-01T00:30:00Z': (4101, 4101),
+        })
+
+        print("\n2. Replacing a Row:")
+        changed = db.insert_generation_data_bulk([
+            generation_row('2024-01-01T00:30:00Z', '2024-01-01 00:30:00', 4200, 4200),
+        ])
+        rows = fetch_generation_rows(db_path)
+        overall_pass &= check(f"1 row changed (returned {changed})", changed == 1)
+        overall_pass &= check("Row replaced, not duplicated", rows.get('2024-01-01T00:30:00Z') == (4200, 4200) and len(rows) == 2)
+
+        print("\n3. Failed Write:")
+        # timestamp is NOT NULL, so the whole batch is rolled back
+        changed = db.insert_generation_data_bulk([
+            generation_row('2024-01-01T01:00:00Z', '2024-01-01 01:00:00', 4300, 4300),
+            generation_row(None, None, 4300, 4300),
+        ])
+        rows = fetch_generation_rows(db_path)
+        overall_pass &= check(f"Returned -1 (returned {changed})", changed == -1)
+        overall_pass &= check("Nothing from the failed batch stored", '2024-01-01T01:00:00Z' not in rows)
+
+    print("\n==============================")
+    if overall_pass:
+        print("🎉 GENERATION BULK INSERT TEST PASSED!")
+    else:
+        print("❌ GENERATION BULK INSERT TEST FAILED")
+
+    return overall_pass
+
+def test_backfill_store_functions():
+    """Test the GridTracker functions the backfill uses to store a batch of API points"""
+    from main import GridTracker
+
+    print("\nTesting Backfill Store Functions")
+    print("=" * 50)
+
+    overall_pass = True
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'grid.db')
+        # Only the database is needed, so skip the constructor and its API clients
+        tracker = GridTracker.__new__(GridTracker)
+        tracker.db = create_generation_database(db_path)
+        tracker.db.insert_carbon_intensity_data_bulk([
+            ('2024-01-01T00:30Z', 100, True),
+            ('2024-01-01T01:00Z', 110, False),
+        ])
+
+        print("\n1. Carbon Intensity Batch:")
+        # Points as returned by get_intensity_data
+        changed = tracker._store_carbon_intensity_points([
+            {'timestamp': '2024-01-01T00:30Z', 'emissions': 95, 'is_forecast': False},
+            {'timestamp': '2024-01-01T01:00Z', 'emissions': 120, 'is_forecast': True},
+            {'timestamp': '2024-01-01T01:30Z', 'emissions': 105},
+        ])
+        rows = fetch_carbon_rows(db_path)
+        overall_pass &= check(f"2 rows changed (returned {changed})", changed == 2)
+        overall_pass &= check(f"Forecast replaced, actual kept, new row stored: {rows}", rows == {
+            '2024-01-01T00:30Z': (95, 0),
+            '2024-01-01T01:00Z': (110, 0),
+            '2024-01-01T01:30Z': (105, 0),
+        })
+
+        print("\n2. Generation Batch:")
+        # Points as returned by get_generation_data, with one fuel not reported
+        point = {'timestamp': '2024-01-01T00:30:00Z', 'settlement_period': 2,
+                 'biomass': 1500.2, 'fossil_gas': 8000, 'fossil_hard_coal': None, 'fossil_oil': 0,
+                 'hydro_pumped_storage': 0, 'hydro_run_of_river': 300, 'nuclear': 4000,
+                 'other': 100, 'solar': 0, 'wind_offshore': 6000, 'wind_onshore': 2000}
+        changed = tracker._store_generation_points([point])
+        with sqlite3.connect(db_path) as conn:
+            stored = conn.execute("SELECT timestamp_sql, biomass, total FROM generation_30min_data").fetchall()
+        overall_pass &= check(f"1 row stored (returned {changed})", changed == 1)
+        overall_pass &= check(f"timestamp_sql and total filled in: {stored}", stored == [('2024-01-01 00:30:00', 1500, 21900)])
+
+    print("\n==============================")
+    if overall_pass:
+        print("🎉 BACKFILL STORE TEST PASSED!")
+    else:
+        print("❌ BACKFILL STORE TEST FAILED")
+
+    return overall_pass
+
+def test_bulk_insert():
+    """Run all bulk insert tests"""
+    results = {
+        'Carbon Intensity': test_carbon_intensity_bulk_insert(),
+        'Generation': test_generation_bulk_insert(),
+        'Backfill Store': test_backfill_store_functions(),
+    }
+
+    print("\n" + "=" * 60)
+    print("OVERALL TEST RESULTS")
+    print("=" * 60)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASSED' if passed else '❌ FAILED'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if test_bulk_insert() else 1)
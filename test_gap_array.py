@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test script for gap detection on a temporary database with mixed timestamp formats
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from data_gap_detector import DataGapDetector, gap_array_to_tuples
+from database import Database
+from datetime import datetime, timezone
+import sqlite3
+import tempfile
+
+# Stored rows on the 30-minute grid of 2024-01-01. 01:00 is stored twice in
+# different formats and 01:30 is missing.
+STORED_TIMESTAMPS = [
+    '2024-01-01T00:30Z',
+    '2024-01-01T01:00:00Z',
+    '2024-01-01T01:00+00:00',
+    '2024-01-01T02:00:00+00:00',
+    '2024-01-01T02:30Z',
+]
+
+def at(hour, minute):
+    """Datetime on 2024-01-01 in UTC"""
+    return datetime(2024, 1, 1, hour, minute, tzinfo=timezone.utc)
+
+def create_test_database(db_path):
+    """Create the tables and store STORED_TIMESTAMPS in the carbon intensity table"""
+    Database(db_path=db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO carbon_intensity_30min_data (timestamp, emissions, is_forecast) VALUES (?, 100, 0)",
+            [(ts,) for ts in STORED_TIMESTAMPS]
+        )
+        conn.commit()
+
+def check_gaps(name, gaps, expected):
+    """Compare detected gaps with the expected (start, end) pairs"""
+    if gaps == expected:
+        print(f"✅ SUCCESS: {name}: {len(gaps)} gaps as expected")
+        return True
+    print(f"❌ FAILURE: {name}")
+    print(f"  Expected: {[(start.isoformat(), end.isoformat()) for start, end in expected]}")
+    print(f"  Found:    {[(start.isoformat(), end.isoformat()) for start, end in gaps]}")
+    return False
+
+def test_gap_array():
+    """Test detect_gap_array with mixed formats, duplicate slots and explicit ranges"""
+    print("Testing Gap Array Detection")
+    print("=" * 50)
+
+    overall_pass = True
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'grid.db')
+        create_test_database(db_path)
+        detector = DataGapDetector(db_path=db_path)
+
+        # Range taken from the table, so only the interior gap is missing.
+        # The duplicate 01:00 slot must not hide or add a gap.
+        print("\n1. Stored Range:")
+        gaps = gap_array_to_tuples(detector.detect_gap_array('carbon_intensity_30min_data', 30))
+        overall_pass &= check_gaps("Stored range", gaps, [(at(1, 30), at(1, 30))])
+
+        # Explicit range adds a lead-in gap before the first row and a tail gap after the last
+        print("\n2. Explicit Range:")
+        gaps = gap_array_to_tuples(detector.detect_gap_array(
+            'carbon_intensity_30min_data', 30, start_time=at(0, 0), end_time=at(4, 0)
+        ))
+        overall_pass &= check_gaps("Explicit range", gaps, [
+            (at(0, 0), at(0, 0)),
+            (at(1, 30), at(1, 30)),
+            (at(3, 0), at(4, 0)),
+        ])
+
+        # Range with nothing stored is one gap covering all of it
+        print("\n3. Empty Range:")
+        gaps = gap_array_to_tuples(detector.detect_gap_array(
+            'carbon_intensity_30min_data', 30, start_time=at(10, 0), end_time=at(12, 0)
+        ))
+        overall_pass &= check_gaps("Empty range", gaps, [(at(10, 0), at(12, 0))])
+
+        # Same results through the list-of-tuples interface
+        print("\n4. detect_data_gaps:")
+        gaps = detector.detect_data_gaps('carbon_intensity_30min_data', 30)
+        overall_pass &= check_gaps("detect_data_gaps", gaps, [(at(1, 30), at(1, 30))])
+
+    print("\n==============================")
+    if overall_pass:
+        print("🎉 GAP ARRAY TEST PASSED!")
+    else:
+        print("❌ GAP ARRAY TEST FAILED")
+
+    return overall_pass
+
+if __name__ == "__main__":
+    sys.exit(0 if test_gap_array() else 1)